@@ -1,20 +1,62 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Form
+import time
+MODULE_IMPORT_STARTED = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Form, Query, Request, Response
+from fastapi.responses import StreamingResponse, RedirectResponse, HTMLResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers, MutableHeaders
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne, ReturnDocument, CursorType, monitoring
+from bson import Int64
+from pymongo.errors import DuplicateKeyError, CollectionInvalid, PyMongoError, BulkWriteError
 import os
+import re
+import json
+import html
+import hashlib
+import secrets
+import socket
+import importlib
+import smtplib
+from email.message import EmailMessage
+import math
+import heapq
+import itertools
+import bisect
 import logging
 import asyncio
+import atexit
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, Field, EmailStr, ConfigDict, ValidationError
+from typing import List, Optional, Dict, Tuple, AsyncIterator
+from collections import defaultdict, deque, OrderedDict, Counter
 import uuid
+from contextvars import ContextVar
 from datetime import datetime, timezone, timedelta
+from email.utils import parsedate_to_datetime
+import xml.etree.ElementTree as ET
+import gzip
 import bcrypt
 import jwt
-import boto3
-from botocore.exceptions import ClientError
+import httpx
+try:
+    import brotli
+except ImportError:  # gzip-only when the brotli wheel is unavailable
+    brotli = None
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # only needed for INVALIDATION_BACKEND=redis
+    aioredis = None
+from botocore.exceptions import ClientError, BotoCoreError
+from starlette.background import BackgroundTask
+from urllib.parse import parse_qsl, unquote, urlencode
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -41,9 +83,38 @@ async def get_mongo_client():
                 logging.error(f"Failed to connect to MongoDB after {max_retries} attempts")
                 raise
 
+# Commands run by the request being profiled (see Request Profiling), None otherwise
+profiled_commands: ContextVar[Optional[list]] = ContextVar("profiled_commands", default=None)
+# Names of the commands the current request has started, for its access log record
+request_db_ops: ContextVar[Optional[list]] = ContextVar("request_db_ops", default=None)
+# Names of the commands the current request completed, so the circuit breaker only trusts real round trips
+request_db_succeeded: ContextVar[Optional[list]] = ContextVar("request_db_succeeded", default=None)
+
+class RequestCommandListener(monitoring.CommandListener):
+    """Attributes MongoDB commands to the request that ran them; Motor copies the context into its executor threads"""
+    def started(self, event):
+        ops = request_db_ops.get()
+        if ops is not None:
+            ops.append(event.command_name)  # list.append is atomic, concurrent commands are safe
+
+    def succeeded(self, event):
+        succeeded = request_db_succeeded.get()
+        if succeeded is not None:
+            succeeded.append(event.command_name)
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event, failed=True)
+
+    def _record(self, event, failed=False):
+        commands = profiled_commands.get()
+        if commands is None or len(commands) >= PROFILE_MAX_COMMANDS:
+            return
+        commands.append({"command": event.command_name, "duration_ms": round(event.duration_micros / 1000, 3), "failed": failed})
+
 # Initialize MongoDB connection
 try:
-    client = AsyncIOMotorClient(os.environ['MONGO_URL'], serverSelectionTimeoutMS=10000)
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], serverSelectionTimeoutMS=10000, event_listeners=[RequestCommandListener()])
     db = client[os.environ['DB_NAME']]
 except Exception as e:
     logging.error(f"MongoDB initialization error: {str(e)}")
@@ -54,14 +125,51 @@ except Exception as e:
 # JWT Configuration
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production')
 JWT_ALGORITHM = 'HS256'
-JWT_EXPIRATION_HOURS = 24 * 7  # 7 days
+ACCESS_TOKEN_MINUTES = int(os.environ.get('ACCESS_TOKEN_MINUTES', '15'))
+REFRESH_TOKEN_DAYS = int(os.environ.get('REFRESH_TOKEN_DAYS', '30'))
+ADMIN_TOKEN_HOURS = 12
 
-security = HTTPBearer()
+# Missing credentials raise 401 in the auth dependencies rather than HTTPBearer's 403
+security = HTTPBearer(auto_error=False)
 
-# Create the main app
-app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
+# ==================== Startup Profile ====================
+
+# Filled in as the process boots: module import, deferred imports/clients, lifespan and warmup phases
+startup_profile = {"import_ms": None, "deferred": {}, "lifespan": {}, "warmup": {"status": "pending", "tasks": []}}
+STARTUP_TASKS = []  # warmup hooks, run in registration order once the app is already serving
+
+def startup_task(func):
+    """Register a warmup hook: database prep and worker starts that must not delay readiness"""
+    STARTUP_TASKS.append(func)
+    return func
+
+class Lazy:
+    """Stands in for a module or client that is slow to create, building it on first attribute access"""
+    def __init__(self, name: str, factory):
+        self._lazy_name = name
+        self._lazy_factory = factory
+        self._lazy_target = None
+
+    def __getattr__(self, attr):
+        if self._lazy_target is None:
+            started = time.perf_counter()
+            self._lazy_target = self._lazy_factory()
+            startup_profile["deferred"][self._lazy_name] = round((time.perf_counter() - started) * 1000, 1)
+        return getattr(self._lazy_target, attr)
+
+np = Lazy("numpy", lambda: importlib.import_module("numpy"))
+
+def load_pyinstrument():
+    module = importlib.import_module("pyinstrument")
+    for submodule in ("renderers", "session"):
+        importlib.import_module(f"pyinstrument.{submodule}")
+    return module
+
+# Optional: only needed when an admin profiles a request
+pyinstrument = Lazy("pyinstrument", load_pyinstrument)
+
 # ==================== Models ====================
 
 class User(BaseModel):
@@ -82,9 +190,17 @@ class UserLogin(BaseModel):
     password: str
 
 class TokenResponse(BaseModel):
-    token: str
+    token: str  # short-lived access token
+    refresh_token: str
+    expires_in: int  # access token lifetime in seconds
     user: User
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class MembershipUpdate(BaseModel):
+    tier: str  # free, bronze, silver, gold
+
 class Course(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -150,6 +266,18 @@ class CommunityPost(BaseModel):
     likes_count: int = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class CommunityReplyCreate(BaseModel):
+    content: str = Field(..., min_length=1, max_length=5000)
+
+class CommunityReply(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    post_id: str
+    user_id: str
+    user_name: str
+    content: str
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
 class NewsArticle(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -164,6 +292,7 @@ class NewsSource(BaseModel):
     name: str
     logo: str
     url: str
+    feed_url: Optional[str] = None  # RSS/Atom feed polled by the news ingester
 
 class ContactForm(BaseModel):
     name: str
@@ -195,23 +324,138 @@ class ContentBlock(BaseModel):
     content_type: str  # "text", "html", "image", "json"
     data: dict  # Flexible data structure
 
+class CourseCard(BaseModel):
+    id: str
+    title: str
+    thumbnail: str
+    instructor: str
+    duration: str
+    lesson_count: int
+    tier: str
+    category: str
+    difficulty: str
+
+class RelatedCourse(CourseCard):
+    score: float  # weighted cosine similarity to the course being viewed, 0-1
+
+class ResourceCard(BaseModel):
+    id: str
+    title: str
+    resource_type: str
+    thumbnail: Optional[str] = None
+    tier_required: str = "free"
+
+class CatalogResponse(BaseModel):
+    tier: str
+    courses: List[CourseCard]
+    resources: List[ResourceCard]
+    locked_courses: int  # catalog items above the caller's tier, for upsell
+    locked_resources: int
+
+class PublicStats(BaseModel):
+    total_users: int
+    total_courses: int
+    updated_at: str
+
+class MediaLink(BaseModel):
+    url: str
+    signed: bool  # False for media hosted outside our bucket
+    expires_at: Optional[str] = None
+
+class ProgressHeartbeat(BaseModel):
+    course_id: str
+    lesson_order: int = Field(..., ge=0, le=4095)
+    position_seconds: float = Field(0, ge=0)
+    completed: bool = False
+
+class CourseProgress(BaseModel):
+    course_id: str
+    completed_lessons: int
+    lesson_count: int
+    percent_complete: float
+    last_lesson_order: Optional[int] = None
+    last_position_seconds: float = 0
+    completed_orders: Optional[List[int]] = None  # only on the single-course endpoint
+    updated_at: Optional[str] = None
+
+class CourseDetail(BaseModel):
+    course: Course
+    lessons: List[Lesson]
+    can_access: Optional[bool] = None  # set when the request is authenticated
+    progress: Optional[CourseProgress] = None
+
+class CatalogImportIssue(BaseModel):
+    line: int  # 1-based line of the NDJSON body
+    type: Optional[str] = None
+    id: Optional[str] = None
+    error: str
+
+class CatalogImportReport(BaseModel):
+    dry_run: bool
+    received: int
+    valid: int
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    errors: List[CatalogImportIssue]
+    errors_truncated: bool = False
+
+class CourseSuggestion(BaseModel):
+    text: str
+    type: str  # title, instructor, category
+    course_id: Optional[str] = None  # set for title suggestions
+
+class SearchHit(BaseModel):
+    type: str  # course, resource, podcast, news, community
+    id: str
+    title: str
+    snippet: str
+    tier: str
+    score: float
+
+class SearchResponse(BaseModel):
+    query: str
+    total: int
+    page: int
+    page_size: int
+    results: List[SearchHit]
+    facets: Dict[str, Dict[str, int]]  # {"type": {...}, "tier": {...}}
+
 # ==================== AWS S3 Setup ====================
 
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY'),
-    region_name=os.environ.get('AWS_REGION', 'us-east-1')
-)
+def create_s3_client():
+    import boto3  # ~250ms with client construction; only paid when media is first uploaded or signed
+    return boto3.client(
+        's3',
+        aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY'),
+        region_name=os.environ.get('AWS_REGION', 'us-east-1')
+    )
+
+s3_client = Lazy("s3_client", create_s3_client)
 S3_BUCKET = os.environ.get('AWS_S3_BUCKET', 'tkr-coaching-assets')
 
 # ==================== Auth Helpers ====================
 
-def create_jwt_token(user_id: str, email: str) -> str:
+MEMBERSHIP_TIERS = ["free", "bronze", "silver", "gold"]
+TIER_RANK = {tier: rank for rank, tier in enumerate(MEMBERSHIP_TIERS)}
+
+def create_jwt_token(user_id: str, email: str, tier: str = "free", token_version: int = 0,
+                     name: Optional[str] = None, role: str = "member") -> str:
+    """Issue a short-lived access token carrying everything gated routes need to authorize"""
+    now = datetime.now(timezone.utc)
+    lifetime = timedelta(hours=ADMIN_TOKEN_HOURS) if role == "admin" else timedelta(minutes=ACCESS_TOKEN_MINUTES)
     payload = {
+        'type': 'access',
         'user_id': user_id,
         'email': email,
-        'exp': datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
+        'name': name,
+        'tier': tier,
+        'ver': token_version,
+        'role': role,
+        'iat': now,
+        'exp': now + lifetime
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
@@ -224,20 +468,165 @@ def verify_jwt_token(token: str) -> dict:
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+async def issue_tokens(user: dict, family_id: Optional[str] = None) -> dict:
+    """Create an access token plus a rotating refresh token; only the refresh token's hash is stored"""
+    refresh_token = secrets.token_urlsafe(32)
+    now = datetime.now(timezone.utc)
+    await db.refresh_tokens.insert_one({
+        "_id": hash_refresh_token(refresh_token),
+        "user_id": user['id'],
+        "family_id": family_id or str(uuid.uuid4()),
+        "token_version": user.get('token_version', 0),
+        "created_at": now,
+        "expires_at": now + timedelta(days=REFRESH_TOKEN_DAYS),
+        "rotated_at": None
+    })
+    return {
+        "token": create_jwt_token(user['id'], user['email'], user.get('membership_tier', 'free'),
+                                  user.get('token_version', 0), user.get('name')),
+        "refresh_token": refresh_token,
+        "expires_in": ACCESS_TOKEN_MINUTES * 60
+    }
+
+async def get_token_claims(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)) -> dict:
+    """Authorize from the verified access token alone - no database round trip"""
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    payload = verify_jwt_token(credentials.credentials)
+    if payload.get('type', 'access') != 'access':
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
+
+async def get_optional_claims(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)) -> Optional[dict]:
+    """Claims for public routes that personalise when signed in; a bad or expired token reads as anonymous"""
+    if credentials is None:
+        return None
+    try:
+        return await get_token_claims(credentials)
+    except HTTPException:
+        return None
+
+def require_tier(tier: str):
+    """Dependency factory: the caller's token must carry at least the given membership tier"""
+    async def check_tier(claims: dict = Depends(get_token_claims)) -> dict:
+        if TIER_RANK.get(claims.get('tier'), 0) < TIER_RANK[tier]:
+            raise HTTPException(status_code=403, detail=f"{tier.capitalize()} membership required")
+        return claims
+    return check_tier
+
+async def require_admin(claims: dict = Depends(get_token_claims)) -> dict:
+    if claims.get('role') != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return claims
+
+async def get_current_user(claims: dict = Depends(get_token_claims)) -> dict:
     if db is None:
         raise HTTPException(status_code=503, detail="Database unavailable")
-    token = credentials.credentials
-    payload = verify_jwt_token(token)
-    user = await db.users.find_one({"id": payload['user_id']}, {"_id": 0})
+    user = await db.users.find_one({"id": claims['user_id']}, {"_id": 0, "password": 0})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
+# ==================== Rate Limiting ====================
+
+# route -> [(key kind, burst capacity, refill period in seconds)]; override with RATE_LIMITS='{"login": [["ip", 20, 60]]}'
+RATE_LIMITS = {
+    "login": [("ip", 20, 60), ("email", 5, 300)],
+    "register": [("ip", 10, 600), ("email", 3, 600)],
+    "contact": [("ip", 5, 600), ("email", 3, 600)],
+    **{route: [tuple(rule) for rule in rules] for route, rules in json.loads(os.environ.get('RATE_LIMITS') or '{}').items()}
+}
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')  # "memory" or "mongo" (shared across workers)
+RATE_LIMIT_MAX_KEYS = 100_000
+# Number of trusted reverse proxies in front of the app that append to X-Forwarded-For.
+# 0 uses the socket peer, so clients reaching the app directly cannot spoof their address.
+FORWARDED_ALLOW_HOPS = int(os.environ.get('FORWARDED_ALLOW_HOPS', '0'))
+
+def client_ip(request: Request) -> str:
+    forwarded = [ip.strip() for ip in request.headers.get("x-forwarded-for", "").split(",") if ip.strip()]
+    if FORWARDED_ALLOW_HOPS and forwarded:
+        return forwarded[-min(FORWARDED_ALLOW_HOPS, len(forwarded))]
+    return request.client.host if request.client else "unknown"
+
+class RateLimiter:
+    """Token buckets per (route, key kind, key value).
+
+    The in-memory bucket is always consulted first, so a burst from one client
+    is rejected without touching MongoDB. With the "mongo" backend an allowed
+    request is also counted in a sliding window shared by every worker.
+    """
+    def __init__(self, limits: dict, backend: str = "memory"):
+        self.limits = limits
+        self.backend = backend
+        self.buckets = OrderedDict()  # bucket key -> (tokens, last refill, period), least recently used first
+
+    def _take_local(self, key: str, capacity: int, period: float) -> float:
+        now = time.monotonic()
+        tokens, updated, _ = self.buckets.pop(key, (capacity, now, period))
+        tokens = min(capacity, tokens + (now - updated) * capacity / period)
+        if tokens >= 1:
+            self.buckets[key] = (tokens - 1, now, period)
+            return 0
+        self.buckets[key] = (tokens, now, period)
+        return (1 - tokens) * period / capacity
+
+    async def _take_shared(self, key: str, capacity: int, period: float) -> float:
+        now = time.time()
+        window = int(now // period)
+        current = await db.rate_limits.find_one_and_update(
+            {"_id": f"{key}:{window}"},
+            {"$inc": {"count": 1},
+             "$setOnInsert": {"expires_at": datetime.now(timezone.utc) + timedelta(seconds=2 * period)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        previous = await db.rate_limits.find_one({"_id": f"{key}:{window - 1}"}, {"count": 1})
+        elapsed = now - window * period
+        estimate = (previous or {}).get("count", 0) * (1 - elapsed / period) + current["count"]
+        return period - elapsed if estimate > capacity else 0
+
+    def _evict(self):
+        # Least recently used first: usually long refilled, and at worst a client gets a fresh bucket
+        while len(self.buckets) > RATE_LIMIT_MAX_KEYS:
+            self.buckets.popitem(last=False)
+
+    async def check(self, route: str, kind: str, value: str):
+        """Raise 429 with Retry-After if this request exceeds any matching bucket"""
+        for rule_kind, capacity, period in self.limits.get(route, ()):
+            if rule_kind != kind:
+                continue
+            key = f"{route}:{kind}:{value.lower()}"
+            retry_after = self._take_local(key, capacity, period)
+            if not retry_after and self.backend == "mongo" and db is not None:
+                try:
+                    retry_after = await self._take_shared(key, capacity, period)
+                except Exception as e:
+                    logger.warning(f"Shared rate limit check failed, using local limits only: {str(e)}")
+            if retry_after:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests. Please try again later.",
+                    headers={"Retry-After": str(math.ceil(retry_after))}
+                )
+        self._evict()
+
+rate_limiter = RateLimiter(RATE_LIMITS, RATE_LIMIT_BACKEND)
+
+def rate_limit(route: str):
+    """Dependency enforcing the per-IP limits for a route before its handler runs"""
+    async def check_ip(request: Request):
+        await rate_limiter.check(route, "ip", client_ip(request))
+    return check_ip
+
 # ==================== Auth Routes ====================
 
-@api_router.post("/auth/register", response_model=TokenResponse)
+@api_router.post("/auth/register", response_model=TokenResponse, dependencies=[Depends(rate_limit("register"))])
 async def register(user_data: UserCreate):
+    await rate_limiter.check("register", "email", user_data.email)
+
     # Check if user exists
     existing_user = await db.users.find_one({"email": user_data.email})
     if existing_user:
@@ -254,13 +643,15 @@ async def register(user_data: UserCreate):
     
     await db.users.insert_one(user_dict)
     
-    # Create token
-    token = create_jwt_token(user_obj.id, user_obj.email)
+    # Create tokens
+    tokens = await issue_tokens(user_dict)
     
-    return TokenResponse(token=token, user=user_obj)
+    return TokenResponse(**tokens, user=user_obj)
 
-@api_router.post("/auth/login", response_model=TokenResponse)
+@api_router.post("/auth/login", response_model=TokenResponse, dependencies=[Depends(rate_limit("login"))])
 async def login(credentials: UserLogin):
+    await rate_limiter.check("login", "email", credentials.email)
+
     # Find user
     user = await db.users.find_one({"email": credentials.email}, {"_id": 0})
     if not user:
@@ -270,15 +661,80 @@ async def login(credentials: UserLogin):
     if not bcrypt.checkpw(credentials.password.encode(), user['password'].encode()):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    # Create token
-    token = create_jwt_token(user['id'], user['email'])
+    # Create tokens
+    tokens = await issue_tokens(user)
     
     # Remove password from response
     user.pop('password', None)
     if isinstance(user['created_at'], str):
         user['created_at'] = datetime.fromisoformat(user['created_at'])
     
-    return TokenResponse(token=token, user=User(**user))
+    return TokenResponse(**tokens, user=User(**user))
+
+@api_router.post("/auth/refresh", response_model=TokenResponse)
+async def refresh_tokens(request_data: RefreshRequest):
+    """Exchange a refresh token for a new access/refresh pair.
+
+    Each refresh token is single-use. Presenting one that was already rotated
+    means it leaked, so the whole token family is revoked.
+    """
+    token_hash = hash_refresh_token(request_data.refresh_token)
+    stored = await db.refresh_tokens.find_one_and_update(
+        {"_id": token_hash, "rotated_at": None},
+        {"$set": {"rotated_at": datetime.now(timezone.utc)}}
+    )
+    if not stored:
+        reused = await db.refresh_tokens.find_one({"_id": token_hash}, {"family_id": 1})
+        if reused:
+            await db.refresh_tokens.delete_many({"family_id": reused["family_id"]})
+            logger.warning(f"Refresh token reuse detected, revoked token family {reused['family_id']}")
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    expires_at = stored["expires_at"]
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    if expires_at < datetime.now(timezone.utc):
+        raise HTTPException(status_code=401, detail="Refresh token has expired")
+
+    # Refresh is the one place that reads the user: it picks up tier changes and revocations
+    user = await db.users.find_one({"id": stored["user_id"]}, {"_id": 0, "password": 0})
+    if not user or user.get('token_version', 0) != stored.get('token_version', 0):
+        raise HTTPException(status_code=401, detail="Session has been revoked")
+
+    tokens = await issue_tokens(user, family_id=stored["family_id"])
+    if isinstance(user['created_at'], str):
+        user['created_at'] = datetime.fromisoformat(user['created_at'])
+    return TokenResponse(**tokens, user=User(**user))
+
+@api_router.post("/auth/logout")
+async def logout(request_data: RefreshRequest):
+    """Revoke the refresh token family for this session"""
+    stored = await db.refresh_tokens.find_one({"_id": hash_refresh_token(request_data.refresh_token)}, {"family_id": 1})
+    if stored:
+        await db.refresh_tokens.delete_many({"family_id": stored["family_id"]})
+    return {"success": True}
+
+async def revoke_user_sessions(user_id: str):
+    """Invalidate every refresh token of a user; access tokens lapse within ACCESS_TOKEN_MINUTES"""
+    await db.users.update_one({"id": user_id}, {"$inc": {"token_version": 1}})
+    await db.refresh_tokens.delete_many({"user_id": user_id})
+
+@api_router.put("/admin/users/{user_id}/membership")
+async def set_user_membership(user_id: str, update: MembershipUpdate, _: dict = Depends(require_admin)):
+    """Change a member's tier; their next token refresh carries it"""
+    if update.tier not in TIER_RANK:
+        raise HTTPException(status_code=400, detail=f"Unknown tier: {update.tier}")
+    result = await db.users.update_one({"id": user_id}, {"$set": {"membership_tier": update.tier}})
+    if not result.matched_count:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"success": True, "tier": update.tier}
+
+@api_router.post("/admin/users/{user_id}/revoke-sessions")
+async def revoke_sessions(user_id: str, _: dict = Depends(require_admin)):
+    """Sign a user out everywhere: none of their refresh tokens will refresh again"""
+    if not await db.users.find_one({"id": user_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="User not found")
+    await revoke_user_sessions(user_id)
+    return {"success": True}
 
 @api_router.get("/auth/me", response_model=User)
 async def get_me(current_user: dict = Depends(get_current_user)):
@@ -307,6 +763,11 @@ async def get_courses(category: Optional[str] = None, tier: Optional[str] = None
             course['created_at'] = datetime.fromisoformat(course['created_at'])
     return courses
 
+@api_router.get("/courses/suggest", response_model=List[CourseSuggestion])
+async def suggest_courses(q: str = Query(..., min_length=1, max_length=100), limit: int = Query(8, ge=1, le=20)):
+    """Typeahead suggestions for course titles, instructors and categories, served from memory"""
+    return suggest_index.suggest(q, limit)
+
 @api_router.get("/courses/{course_id}", response_model=Course)
 async def get_course(course_id: str):
     course = await db.courses.find_one({"id": course_id}, {"_id": 0})
@@ -316,6 +777,34 @@ async def get_course(course_id: str):
         course['created_at'] = datetime.fromisoformat(course['created_at'])
     return Course(**course)
 
+@api_router.get("/courses/{course_id}/full", response_model=CourseDetail)
+async def get_course_full(course_id: str, claims: Optional[dict] = Depends(get_optional_claims)):
+    """Course plus ordered lessons in one round trip, with entitlement and progress when signed in"""
+    cached = course_detail_cache.get(course_id)
+    if cached is None:
+        pipeline = [
+            {"$match": {"id": course_id}},
+            {"$limit": 1},
+            # Equality lookup rides the (course_id, order) index on lessons
+            {"$lookup": {"from": "lessons", "localField": "id", "foreignField": "course_id", "as": "lessons"}},
+            {"$project": {"_id": 0, "lessons._id": 0}}
+        ]
+        docs = await db.courses.aggregate(pipeline).to_list(1)
+        if not docs:
+            raise HTTPException(status_code=404, detail="Course not found")
+        lessons = sorted(docs[0].pop("lessons"), key=lambda lesson: lesson.get("order", 0))
+        if isinstance(docs[0].get('created_at'), str):
+            docs[0]['created_at'] = datetime.fromisoformat(docs[0]['created_at'])
+        cached = (Course(**docs[0]), [Lesson(**lesson) for lesson in lessons])
+        course_detail_cache.set(course_id, cached)
+
+    course, lessons = cached
+    detail = CourseDetail(course=course, lessons=lessons)
+    if claims:
+        detail.can_access = tier_rank(claims.get('tier')) >= tier_rank(course.tier)
+        detail.progress = await load_course_progress(claims['user_id'], course_id, course.lesson_count)
+    return detail
+
 @api_router.get("/courses/{course_id}/lessons", response_model=List[Lesson])
 async def get_course_lessons(course_id: str):
     lessons = await db.lessons.find({"course_id": course_id}, {"_id": 0}).sort("order", 1).to_list(1000)
@@ -396,6 +885,377 @@ async def get_resources(resource_type: Optional[str] = None):
             resource['created_at'] = datetime.fromisoformat(resource['created_at'])
     return resources
 
+# ==================== Member Catalog ====================
+
+CATALOG_CACHE_SECONDS = int(os.environ.get('CATALOG_CACHE_SECONDS', '300'))
+COURSE_CARD_FIELDS = {f: 1 for f in CourseCard.model_fields} | {"_id": 0}
+RESOURCE_CARD_FIELDS = {f: 1 for f in ResourceCard.model_fields} | {"_id": 0}
+
+class TTLCache:
+    """Small in-process cache with per-entry expiry and explicit invalidation"""
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = {}  # key -> (expires_at, value)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self.entries.pop(key, None)
+            return None
+        return entry[1]
+
+    def set(self, key, value):
+        if len(self.entries) >= self.max_entries:
+            self.entries.pop(next(iter(self.entries)))  # evict the oldest insertion
+        self.entries[key] = (time.monotonic() + self.ttl_seconds, value)
+
+    def invalidate(self, key=None):
+        if key is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(key, None)
+
+catalog_cache = TTLCache(CATALOG_CACHE_SECONDS)
+course_detail_cache = TTLCache(CATALOG_CACHE_SECONDS)
+
+def tier_rank(tier: Optional[str]) -> int:
+    return TIER_RANK.get(tier or "free", 0)
+
+def invalidate_catalog():
+    """Call after any write to courses or resources; every worker evicts"""
+    invalidation_bus.publish("catalog")
+
+def invalidate_course_detail(course_id: Optional[str] = None):
+    """Call after any write to a course's lessons; every worker evicts"""
+    invalidation_bus.publish("course_detail", course_id)
+
+@api_router.get("/me/catalog", response_model=CatalogResponse)
+async def get_my_catalog(
+    category: Optional[str] = None,
+    resource_type: Optional[str] = None,
+    claims: dict = Depends(get_token_claims)
+):
+    """Courses and resources unlocked by the caller's tier, as lightweight cards.
+
+    The tier comes from the access token and is pushed into the queries as
+    tier_rank <= user rank, served by the (tier_rank, ...) compound indexes.
+    Results are cached per tier and filter until the catalog changes.
+    """
+    tier = claims.get('tier') or "free"
+    key = (tier, category, resource_type)
+    cached = catalog_cache.get(key)
+    if cached is not None:
+        return cached
+
+    rank = tier_rank(tier)
+    course_query = {"tier_rank": {"$lte": rank}}
+    locked_course_query = {"tier_rank": {"$gt": rank}}
+    if category:
+        course_query['category'] = locked_course_query['category'] = category
+    resource_query = {"tier_rank": {"$lte": rank}}
+    locked_resource_query = {"tier_rank": {"$gt": rank}}
+    if resource_type:
+        resource_query['resource_type'] = locked_resource_query['resource_type'] = resource_type
+
+    courses, resources, locked_courses, locked_resources = await asyncio.gather(
+        db.courses.find(course_query, COURSE_CARD_FIELDS).sort([("tier_rank", 1), ("title", 1)]).to_list(1000),
+        db.resources.find(resource_query, RESOURCE_CARD_FIELDS).sort([("tier_rank", 1), ("title", 1)]).to_list(1000),
+        db.courses.count_documents(locked_course_query),
+        db.resources.count_documents(locked_resource_query)
+    )
+    catalog = CatalogResponse(
+        tier=tier,
+        courses=courses,
+        resources=resources,
+        locked_courses=locked_courses,
+        locked_resources=locked_resources
+    )
+    catalog_cache.set(key, catalog)
+    return catalog
+
+# ==================== Media Delivery ====================
+
+MEDIA_URL_SECONDS = int(os.environ.get('MEDIA_URL_SECONDS', '900'))
+MEDIA_URL_REFRESH_SECONDS = int(os.environ.get('MEDIA_URL_REFRESH_SECONDS', '120'))  # re-sign this long before expiry
+MEDIA_PROXY_HEADERS = ("content-type", "content-length", "content-range", "accept-ranges", "etag", "last-modified")
+S3_URL_RE = re.compile(r"^https://(?P<bucket>[^./]+)\.s3[.-](?:[a-z0-9-]+\.)?amazonaws\.com/(?P<key>.+)$")
+RANGE_RE = re.compile(r"^bytes=\d*-\d*$")
+
+# Signed links are reused per (object, tier) until they are close to expiring
+presign_cache = TTLCache(max(MEDIA_URL_SECONDS - MEDIA_URL_REFRESH_SECONDS, 1), max_entries=4096)
+media_http: Optional[httpx.AsyncClient] = None
+
+def s3_object_key(url: str) -> Optional[str]:
+    """Object key when the URL points into our bucket, else None"""
+    if url.startswith("s3://"):
+        bucket, _, key = url[5:].partition("/")
+    else:
+        match = S3_URL_RE.match(url)
+        if not match:
+            return None
+        bucket, key = match.group("bucket"), unquote(match.group("key"))
+    return key if bucket == S3_BUCKET and key else None
+
+def presign_media(key: str, tier: str) -> MediaLink:
+    link = presign_cache.get((key, tier))
+    if link is None:
+        try:
+            url = s3_client.generate_presigned_url(
+                "get_object", Params={"Bucket": S3_BUCKET, "Key": key}, ExpiresIn=MEDIA_URL_SECONDS
+            )
+        except BotoCoreError as e:
+            logger.error(f"Could not sign media URL for {key}: {str(e)}")
+            raise HTTPException(status_code=503, detail="Media temporarily unavailable")
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=MEDIA_URL_SECONDS)
+        link = MediaLink(url=url, signed=True, expires_at=expires_at.isoformat())
+        presign_cache.set((key, tier), link)
+    return link
+
+async def resolve_media(kind: str, item_id: str) -> tuple:
+    """(media url, tier required) for a lesson video or resource download"""
+    if kind == "lessons":
+        lesson = await db.lessons.find_one({"id": item_id}, {"_id": 0, "course_id": 1, "video_url": 1})
+        if not lesson:
+            raise HTTPException(status_code=404, detail="Lesson not found")
+        course = await db.courses.find_one({"id": lesson["course_id"]}, {"_id": 0, "tier": 1})
+        return lesson.get("video_url"), (course or {}).get("tier", "gold")
+    if kind == "resources":
+        resource = await db.resources.find_one({"id": item_id}, {"_id": 0, "download_url": 1, "tier_required": 1})
+        if not resource:
+            raise HTTPException(status_code=404, detail="Resource not found")
+        return resource.get("download_url"), resource.get("tier_required", "free")
+    raise HTTPException(status_code=404, detail="Unknown media type")
+
+def get_media_http() -> httpx.AsyncClient:
+    global media_http
+    if media_http is None:
+        media_http = httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=60.0))
+    return media_http
+
+async def proxy_media(url: str, range_header: Optional[str]) -> StreamingResponse:
+    """Relay (a byte range of) the object as it arrives, without buffering it in the worker"""
+    headers = {"Range": range_header} if range_header and RANGE_RE.match(range_header) else {}
+    http = get_media_http()
+    try:
+        upstream = await http.send(http.build_request("GET", url, headers=headers), stream=True)
+    except httpx.HTTPError as e:
+        logger.error(f"Media proxy upstream unreachable: {str(e)}")
+        raise HTTPException(status_code=502, detail="Media temporarily unavailable")
+    if upstream.status_code == 416:
+        await upstream.aclose()
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                            headers={"Content-Range": upstream.headers.get("content-range", "bytes */*")})
+    if upstream.status_code not in (200, 206):
+        await upstream.aclose()
+        logger.error(f"Media proxy upstream returned {upstream.status_code}")
+        raise HTTPException(status_code=502, detail="Media temporarily unavailable")
+
+    async def relay():
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        except httpx.HTTPError as e:
+            # Headers are already sent; all that is left is to cut the response short
+            logger.error(f"Media proxy upstream failed mid-stream: {str(e)}")
+        finally:
+            await upstream.aclose()
+
+    return StreamingResponse(
+        relay(),
+        status_code=upstream.status_code,
+        headers={h: upstream.headers[h] for h in MEDIA_PROXY_HEADERS if h in upstream.headers},
+        background=BackgroundTask(upstream.aclose)
+    )
+
+@api_router.get("/media/{kind}/{item_id}", response_model=MediaLink)
+async def get_media(kind: str, item_id: str, request: Request,
+                    mode: str = Query("url", pattern="^(url|redirect|proxy)$"),
+                    claims: dict = Depends(get_token_claims)):
+    """Entitlement-checked media access.
+
+    mode=url returns a short-lived signed link, mode=redirect sends the client
+    straight to it, and mode=proxy streams the bytes (honouring Range) for
+    players that cannot follow redirects.
+    """
+    url, tier_required = await resolve_media(kind, item_id)
+    if tier_rank(claims.get('tier')) < tier_rank(tier_required):
+        raise HTTPException(status_code=403, detail=f"{tier_required.capitalize()} membership required")
+    if not url or not url.startswith(("http://", "https://", "s3://")):
+        raise HTTPException(status_code=404, detail="No media available")
+
+    key = s3_object_key(url)
+    if key is None:
+        if mode == "proxy":
+            raise HTTPException(status_code=400, detail="Proxy mode is only available for hosted media")
+        link = MediaLink(url=url, signed=False)
+    else:
+        link = presign_media(key, claims.get('tier') or "free")
+        if mode == "proxy":
+            return await proxy_media(link.url, request.headers.get("range"))
+    if mode == "redirect":
+        return RedirectResponse(link.url, status_code=307, headers={"Cache-Control": "private, no-store"})
+    return link
+
+# ==================== Lesson Progress ====================
+
+PROGRESS_FLUSH_SECONDS = float(os.environ.get('PROGRESS_FLUSH_SECONDS', '10'))
+PROGRESS_WORD_BITS = 63  # bits per stored Int64 word, keeping every word non-negative
+
+def progress_id(user_id: str, course_id: str) -> str:
+    return f"{user_id}:{course_id}"
+
+def completed_orders_from_words(words: dict) -> List[int]:
+    orders = []
+    for word, mask in (words or {}).items():
+        base = int(word) * PROGRESS_WORD_BITS
+        orders.extend(base + bit for bit in range(PROGRESS_WORD_BITS) if mask >> bit & 1)
+    return sorted(orders)
+
+class ProgressBuffer:
+    """Coalesces lesson heartbeats per (user, course) and writes each at most once per flush interval.
+
+    Progress is one course_progress document per (user, course). Completed
+    lessons are a bitset of lesson orders stored as Int64 words under
+    "completed" and merged with $bit, so concurrent flushes from different
+    workers never lose a completion.
+    """
+    def __init__(self):
+        self.pending = {}  # progress id -> buffered state
+        self.in_flight = {}  # the batch being written, still visible to reads
+
+    def record(self, user_id: str, heartbeat: ProgressHeartbeat):
+        key = progress_id(user_id, heartbeat.course_id)
+        state = self.pending.setdefault(key, {"user_id": user_id, "course_id": heartbeat.course_id, "words": {}})
+        state["last_lesson_order"] = heartbeat.lesson_order
+        state["last_position_seconds"] = heartbeat.position_seconds
+        state["updated_at"] = datetime.now(timezone.utc).isoformat()
+        if heartbeat.completed:
+            word = str(heartbeat.lesson_order // PROGRESS_WORD_BITS)
+            state["words"][word] = state["words"].get(word, 0) | 1 << (heartbeat.lesson_order % PROGRESS_WORD_BITS)
+
+    def merge(self, doc: dict) -> dict:
+        # In-flight first, so newer pending heartbeats win the position
+        for state in (self.in_flight.get(doc["_id"]), self.pending.get(doc["_id"])):
+            if state:
+                words = dict(doc.get("completed") or {})
+                for word, mask in state["words"].items():
+                    words[word] = words.get(word, 0) | mask
+                doc.update(completed=words, last_lesson_order=state["last_lesson_order"],
+                           last_position_seconds=state["last_position_seconds"], updated_at=state["updated_at"])
+        return doc
+
+    def pending_for_user(self, user_id: str) -> List[dict]:
+        buffered = {key: state for states in (self.in_flight, self.pending) for key, state in states.items()}
+        return [
+            {"_id": key, "user_id": user_id, "course_id": state["course_id"], "completed": {}}
+            for key, state in buffered.items() if state["user_id"] == user_id
+        ]
+
+    async def flush(self):
+        if not self.pending or self.in_flight:
+            return
+        self.in_flight, self.pending = self.pending, {}
+        batch = self.in_flight
+        try:
+            course_ids = list({state["course_id"] for state in batch.values()})
+            lesson_counts = {
+                c["id"]: c.get("lesson_count", 0)
+                async for c in db.courses.find({"id": {"$in": course_ids}}, {"_id": 0, "id": 1, "lesson_count": 1})
+            }
+            operations = []
+            for key, state in batch.items():
+                update = {
+                    "$set": {
+                        "last_lesson_order": state["last_lesson_order"],
+                        "last_position_seconds": state["last_position_seconds"],
+                        "lesson_count": lesson_counts.get(state["course_id"], 0),
+                        "updated_at": state["updated_at"]
+                    },
+                    "$setOnInsert": {"user_id": state["user_id"], "course_id": state["course_id"]}
+                }
+                if state["words"]:
+                    update["$bit"] = {f"completed.{word}": {"or": Int64(mask)} for word, mask in state["words"].items()}
+                operations.append(UpdateOne({"_id": key}, update, upsert=True))
+            await db.course_progress.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.error(f"Progress flush failed, will retry: {str(e)}")
+            for key, state in batch.items():
+                if key in self.pending:
+                    # Newer heartbeats win for position; completions are unioned
+                    newer = self.pending[key]
+                    for word, mask in state["words"].items():
+                        newer["words"][word] = newer["words"].get(word, 0) | mask
+                else:
+                    self.pending[key] = state
+        finally:
+            self.in_flight = {}
+
+progress_buffer = ProgressBuffer()
+course_tiers = TTLCache(CATALOG_CACHE_SECONDS, max_entries=4096)
+
+async def course_tier(course_id: str) -> Optional[str]:
+    """A course's tier, or None if there is no such course"""
+    tier = course_tiers.get(course_id)
+    if tier is None:
+        course = await db.courses.find_one({"id": course_id}, {"_id": 0, "tier": 1})
+        if not course:
+            return None
+        tier = course["tier"]
+        course_tiers.set(course_id, tier)
+    return tier
+
+def to_course_progress(doc: dict, include_orders: bool = False) -> CourseProgress:
+    orders = completed_orders_from_words(doc.get("completed"))
+    lesson_count = doc.get("lesson_count") or 0
+    return CourseProgress(
+        course_id=doc["course_id"],
+        completed_lessons=len(orders),
+        lesson_count=lesson_count,
+        percent_complete=round(min(100.0, 100.0 * len(orders) / lesson_count), 1) if lesson_count else 0.0,
+        last_lesson_order=doc.get("last_lesson_order"),
+        last_position_seconds=doc.get("last_position_seconds") or 0,
+        completed_orders=orders if include_orders else None,
+        updated_at=doc.get("updated_at")
+    )
+
+@api_router.post("/progress/heartbeat")
+async def record_progress(heartbeat: ProgressHeartbeat, claims: dict = Depends(get_token_claims)):
+    """Record playback position / lesson completion. Buffered; no database write on this path."""
+    tier = await course_tier(heartbeat.course_id)
+    if tier is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    if tier_rank(claims.get('tier')) < tier_rank(tier):
+        raise HTTPException(status_code=403, detail=f"{tier.capitalize()} membership required")
+    progress_buffer.record(claims['user_id'], heartbeat)
+    # Tells the client how often heartbeats are worth sending
+    return {"success": True, "next_heartbeat_seconds": PROGRESS_FLUSH_SECONDS}
+
+@api_router.get("/progress", response_model=List[CourseProgress])
+async def get_my_progress(claims: dict = Depends(get_token_claims)):
+    """Completion for every course the caller has started, in one indexed read"""
+    docs = await db.course_progress.find({"user_id": claims['user_id']}).to_list(1000)
+    seen = {doc["_id"] for doc in docs}
+    docs += [doc for doc in progress_buffer.pending_for_user(claims['user_id']) if doc["_id"] not in seen]
+    return [to_course_progress(progress_buffer.merge(doc)) for doc in docs]
+
+async def load_course_progress(user_id: str, course_id: str, lesson_count: Optional[int] = None) -> CourseProgress:
+    key = progress_id(user_id, course_id)
+    doc = await db.course_progress.find_one({"_id": key}) or {"_id": key, "course_id": course_id, "completed": {}}
+    progress_buffer.merge(doc)
+    if lesson_count is not None:
+        doc["lesson_count"] = lesson_count
+    elif not doc.get("lesson_count"):
+        course = await db.courses.find_one({"id": course_id}, {"_id": 0, "lesson_count": 1})
+        doc["lesson_count"] = (course or {}).get("lesson_count", 0)
+    return to_course_progress(doc, include_orders=True)
+
+@api_router.get("/progress/{course_id}", response_model=CourseProgress)
+async def get_course_progress(course_id: str, claims: dict = Depends(get_token_claims)):
+    return await load_course_progress(claims['user_id'], course_id)
+
 # ==================== Podcast Routes ====================
 
 @api_router.get("/podcast/episodes", response_model=List[PodcastEpisode])
@@ -410,12 +1270,58 @@ async def get_podcast_episodes(season: Optional[int] = None):
             episode['published_at'] = datetime.fromisoformat(episode['published_at'])
     return episodes
 
+# ==================== Community Counters ====================
+
+COUNTER_FLUSH_SECONDS = float(os.environ.get('COUNTER_FLUSH_SECONDS', '2'))
+
+class CounterBuffer:
+    """Coalesces $inc deltas per document in memory and flushes them as one unordered bulk_write.
+
+    Reads call merge() so a document's counters include deltas that are still
+    pending or in flight, and are never visibly behind the user's own clicks.
+    """
+    def __init__(self, collection_name: str):
+        self.collection_name = collection_name
+        self.pending = defaultdict(lambda: defaultdict(int))  # doc id -> {field: delta}
+        self.in_flight = {}
+
+    def add(self, doc_id: str, field: str, delta: int):
+        self.pending[doc_id][field] += delta
+
+    def merge(self, doc: dict) -> dict:
+        for deltas in (self.in_flight.get(doc["id"]), self.pending.get(doc["id"])):
+            for field, delta in (deltas or {}).items():
+                doc[field] = doc.get(field, 0) + delta
+        return doc
+
+    async def flush(self):
+        if not self.pending or self.in_flight:
+            return
+        self.in_flight, self.pending = self.pending, defaultdict(lambda: defaultdict(int))
+        operations = [
+            UpdateOne({"id": doc_id}, {"$inc": {f: d for f, d in deltas.items() if d}})
+            for doc_id, deltas in self.in_flight.items() if any(deltas.values())
+        ]
+        try:
+            if operations:
+                await db[self.collection_name].bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.error(f"Counter flush to {self.collection_name} failed, will retry: {str(e)}")
+            for doc_id, deltas in self.in_flight.items():
+                for field, delta in deltas.items():
+                    self.pending[doc_id][field] += delta
+        finally:
+            self.in_flight = {}
+
+post_counters = CounterBuffer("community_posts")
+
 # ==================== Community Routes ====================
 
 @api_router.get("/community/posts", response_model=List[CommunityPost])
 async def get_community_posts():
     posts = await db.community_posts.find({}, {"_id": 0}).sort("created_at", -1).limit(50).to_list(50)
     for post in posts:
+        post_counters.merge(post)
         if isinstance(post.get('created_at'), str):
             post['created_at'] = datetime.fromisoformat(post['created_at'])
     return posts
@@ -425,10 +1331,60 @@ async def get_community_post(post_id: str):
     post = await db.community_posts.find_one({"id": post_id}, {"_id": 0})
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
+    post_counters.merge(post)
     if isinstance(post.get('created_at'), str):
         post['created_at'] = datetime.fromisoformat(post['created_at'])
     return CommunityPost(**post)
 
+async def get_post_counts(post_id: str) -> dict:
+    post = await db.community_posts.find_one({"id": post_id}, {"_id": 0, "id": 1, "likes_count": 1, "replies_count": 1})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return post_counters.merge(post)
+
+@api_router.post("/community/posts/{post_id}/like")
+async def like_post(post_id: str, claims: dict = Depends(get_token_claims)):
+    """Like a post. Likes are keyed "<post_id>:<user_id>" on _id, so repeat likes are no-ops."""
+    post = await get_post_counts(post_id)
+    try:
+        await db.post_likes.insert_one({
+            "_id": f"{post_id}:{claims['user_id']}",
+            "post_id": post_id,
+            "user_id": claims['user_id'],
+            "created_at": datetime.now(timezone.utc).isoformat()
+        })
+    except DuplicateKeyError:
+        return {"liked": True, "likes_count": post.get("likes_count", 0)}
+    post_counters.add(post_id, "likes_count", 1)
+    return {"liked": True, "likes_count": post.get("likes_count", 0) + 1}
+
+@api_router.delete("/community/posts/{post_id}/like")
+async def unlike_post(post_id: str, claims: dict = Depends(get_token_claims)):
+    post = await get_post_counts(post_id)
+    result = await db.post_likes.delete_one({"_id": f"{post_id}:{claims['user_id']}"})
+    if not result.deleted_count:
+        return {"liked": False, "likes_count": post.get("likes_count", 0)}
+    post_counters.add(post_id, "likes_count", -1)
+    return {"liked": False, "likes_count": post.get("likes_count", 0) - 1}
+
+@api_router.post("/community/posts/{post_id}/replies", response_model=CommunityReply)
+async def create_post_reply(post_id: str, reply_data: CommunityReplyCreate, claims: dict = Depends(get_token_claims)):
+    await get_post_counts(post_id)
+    reply = CommunityReply(post_id=post_id, user_id=claims['user_id'], user_name=claims.get('name') or "Member", content=reply_data.content)
+    reply_dict = reply.model_dump()
+    reply_dict['created_at'] = reply_dict['created_at'].isoformat()
+    await db.community_replies.insert_one(reply_dict)
+    post_counters.add(post_id, "replies_count", 1)
+    return reply
+
+@api_router.get("/community/posts/{post_id}/replies", response_model=List[CommunityReply])
+async def get_post_replies(post_id: str):
+    replies = await db.community_replies.find({"post_id": post_id}, {"_id": 0}).sort("created_at", 1).to_list(500)
+    for reply in replies:
+        if isinstance(reply.get('created_at'), str):
+            reply['created_at'] = datetime.fromisoformat(reply['created_at'])
+    return replies
+
 # ==================== News Routes ====================
 
 @api_router.get("/news/articles", response_model=List[NewsArticle])
@@ -439,19 +1395,249 @@ async def get_news_articles():
             article['published_at'] = datetime.fromisoformat(article['published_at'])
     return articles
 
+# Feed URLs can be overridden per source name with NEWS_FEED_URLS='{"Inman": "https://..."}'
+NEWS_FEED_URLS = json.loads(os.environ.get('NEWS_FEED_URLS') or '{}')
+
+NEWS_SOURCES = [
+    NewsSource(name="HousingWire", logo="https://via.placeholder.com/100x50?text=HousingWire", url="https://www.housingwire.com",
+               feed_url=NEWS_FEED_URLS.get("HousingWire", "https://www.housingwire.com/feed/")),
+    NewsSource(name="Inman", logo="https://via.placeholder.com/100x50?text=Inman", url="https://www.inman.com",
+               feed_url=NEWS_FEED_URLS.get("Inman", "https://www.inman.com/feed/")),
+    NewsSource(name="Mortgage News Daily", logo="https://via.placeholder.com/100x50?text=MND", url="https://www.mortgagenewsdaily.com",
+               feed_url=NEWS_FEED_URLS.get("Mortgage News Daily")),
+    NewsSource(name="Realtor Magazine", logo="https://via.placeholder.com/100x50?text=Realtor", url="https://www.nar.realtor/magazine",
+               feed_url=NEWS_FEED_URLS.get("Realtor Magazine"))
+]
+
 @api_router.get("/news/sources", response_model=List[NewsSource])
 async def get_news_sources():
-    return [
-        NewsSource(name="HousingWire", logo="https://via.placeholder.com/100x50?text=HousingWire", url="https://www.housingwire.com"),
-        NewsSource(name="Inman", logo="https://via.placeholder.com/100x50?text=Inman", url="https://www.inman.com"),
-        NewsSource(name="Mortgage News Daily", logo="https://via.placeholder.com/100x50?text=MND", url="https://www.mortgagenewsdaily.com"),
-        NewsSource(name="Realtor Magazine", logo="https://via.placeholder.com/100x50?text=Realtor", url="https://www.nar.realtor/magazine")
-    ]
+    return NEWS_SOURCES
+
+# ==================== News Ingestion ====================
+
+NEWS_INGEST_INTERVAL_SECONDS = int(os.environ.get('NEWS_INGEST_INTERVAL_SECONDS', '900'))
+NEWS_INGEST_CONCURRENCY = int(os.environ.get('NEWS_INGEST_CONCURRENCY', '4'))
+NEWS_INGEST_BATCH_SIZE = 100
+NEWS_BACKOFF_MAX_SECONDS = 6 * 3600
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+def news_url_hash(url: str) -> str:
+    return hashlib.sha256(url.strip().encode()).hexdigest()
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+def _child_text(elem, *names) -> Optional[str]:
+    for child in elem:
+        if _local_name(child.tag) in names and (child.text or "").strip():
+            return child.text.strip()
+    return None
+
+def _parse_feed_date(value: Optional[str]) -> datetime:
+    if value:
+        try:
+            return parsedate_to_datetime(value).astimezone(timezone.utc)  # RSS (RFC 822)
+        except (TypeError, ValueError):
+            pass
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc)  # Atom (RFC 3339)
+        except ValueError:
+            pass
+    return datetime.now(timezone.utc)
+
+def parse_feed_entry(elem, source: NewsSource) -> Optional[dict]:
+    """Turn one RSS <item> or Atom <entry> element into a news_articles document"""
+    title = _child_text(elem, "title")
+    link = _child_text(elem, "link")
+    thumbnail = None
+    for child in elem:
+        name = _local_name(child.tag)
+        if name == "link" and child.get("href") and child.get("rel", "alternate") == "alternate":
+            link = child.get("href")
+        elif name in ("content", "thumbnail", "enclosure") and child.get("url") and not thumbnail:
+            if child.get("medium", "image") == "image" and child.get("type", "image/").startswith("image/"):
+                thumbnail = child.get("url")
+    if not title or not link:
+        return None
+
+    summary = _child_text(elem, "description", "summary", "content") or ""
+    excerpt = html.unescape(HTML_TAG_RE.sub("", summary)).strip()
+    if len(excerpt) > 300:
+        excerpt = excerpt[:297].rsplit(" ", 1)[0] + "..."
+    return {
+        # Derived from the URL so re-ingesting an article keeps its id
+        "id": str(uuid.uuid5(uuid.NAMESPACE_URL, link)),
+        "url_hash": news_url_hash(link),
+        "title": html.unescape(title),
+        "excerpt": excerpt,
+        "source": source.name,
+        "url": link,
+        "thumbnail": thumbnail,
+        "published_at": _parse_feed_date(_child_text(elem, "pubDate", "published", "updated", "date")).isoformat()
+    }
+
+class NewsIngester:
+    """Polls the configured NewsSource feeds and bulk-upserts new articles into news_articles.
+
+    Feeds are fetched concurrently (bounded by a semaphore) with conditional
+    GETs, parsed incrementally as bytes arrive, and deduplicated on url_hash.
+    A failing source backs off exponentially without holding up the others.
+    """
+    def __init__(self, sources: List[NewsSource], concurrency: int = NEWS_INGEST_CONCURRENCY, timeout: float = 10.0):
+        self.sources = [source for source in sources if source.feed_url]
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.timeout = timeout
+        self.state = {}  # source name -> conditional GET validators and backoff
+        self.metrics = defaultdict(lambda: defaultdict(int))  # source name -> counters
+
+    async def load_state(self):
+        async for state in db.news_feed_state.find({"source": {"$in": [s.name for s in self.sources]}}, {"_id": 0}):
+            self.state[state["source"]] = state
+
+    async def _save_state(self, name: str):
+        await db.news_feed_state.update_one({"source": name}, {"$set": self.state[name]}, upsert=True)
+
+    async def _upsert(self, articles: List[dict]) -> int:
+        if not articles:
+            return 0
+        operations = [
+            UpdateOne(
+                {"url_hash": a["url_hash"]},
+                {"$set": {k: a[k] for k in ("title", "excerpt", "thumbnail")},
+                 "$setOnInsert": {k: a[k] for k in ("id", "url_hash", "source", "url", "published_at")}},
+                upsert=True
+            )
+            for a in articles
+        ]
+        result = await db.news_articles.bulk_write(operations, ordered=False)
+        for article in articles:
+            index_document("news", article)
+        return result.upserted_count
+
+    async def ingest_source(self, http: httpx.AsyncClient, source: NewsSource):
+        name = source.name
+        state = self.state.setdefault(name, {"source": name, "failures": 0})
+        metrics = self.metrics[name]
+        if state.get("retry_at") and datetime.fromisoformat(state["retry_at"]) > datetime.now(timezone.utc):
+            metrics["skipped_backoff"] += 1
+            return
+
+        headers = {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+
+        started = time.perf_counter()
+        async with self.semaphore:
+            try:
+                async with http.stream("GET", source.feed_url, headers=headers) as response:
+                    if response.status_code == 304:
+                        metrics["not_modified"] += 1
+                    else:
+                        response.raise_for_status()
+                        parser = ET.XMLPullParser(events=("end",))
+                        batch = []
+                        async for chunk in response.aiter_bytes():
+                            parser.feed(chunk)
+                            for _, elem in parser.read_events():
+                                if _local_name(elem.tag) not in ("item", "entry"):
+                                    continue
+                                article = parse_feed_entry(elem, source)
+                                elem.clear()
+                                if article:
+                                    batch.append(article)
+                                if len(batch) >= NEWS_INGEST_BATCH_SIZE:
+                                    metrics["articles_inserted"] += await self._upsert(batch)
+                                    metrics["articles_seen"] += len(batch)
+                                    batch = []
+                        parser.close()
+                        metrics["articles_inserted"] += await self._upsert(batch)
+                        metrics["articles_seen"] += len(batch)
+                        metrics["fetched"] += 1
+                        state["etag"] = response.headers.get("etag")
+                        state["last_modified"] = response.headers.get("last-modified")
+                state["failures"] = 0
+                state["retry_at"] = None
+                state["last_success"] = datetime.now(timezone.utc).isoformat()
+            except Exception as e:
+                state["failures"] += 1
+                delay = min(NEWS_INGEST_INTERVAL_SECONDS * 2 ** state["failures"], NEWS_BACKOFF_MAX_SECONDS)
+                state["retry_at"] = (datetime.now(timezone.utc) + timedelta(seconds=delay)).isoformat()
+                state["last_error"] = str(e)[:500]
+                metrics["errors"] += 1
+                logger.warning(f"News feed {name} failed ({state['failures']} in a row), backing off {delay}s: {str(e)}")
+            finally:
+                metrics["last_fetch_ms"] = int((time.perf_counter() - started) * 1000)
+        await self._save_state(name)
+
+    async def ingest_all(self):
+        async with httpx.AsyncClient(timeout=self.timeout, follow_redirects=True,
+                                     headers={"User-Agent": "TKRCoachingNewsBot/1.0"}) as http:
+            await asyncio.gather(*(self.ingest_source(http, source) for source in self.sources))
+
+    def status(self) -> dict:
+        return {
+            source.name: {
+                "feed_url": source.feed_url,
+                "failures": self.state.get(source.name, {}).get("failures", 0),
+                "retry_at": self.state.get(source.name, {}).get("retry_at"),
+                "last_success": self.state.get(source.name, {}).get("last_success"),
+                "last_error": self.state.get(source.name, {}).get("last_error"),
+                **self.metrics[source.name]
+            }
+            for source in self.sources
+        }
+
+    async def run_scheduled(self):
+        # Validators and backoff are reloaded each run: the previous run may have been on another worker
+        await self.load_state()
+        await self.ingest_all()
+
+news_ingester = NewsIngester(NEWS_SOURCES)
+
+@api_router.post("/admin/news/ingest")
+async def trigger_news_ingest(_: dict = Depends(require_admin)):
+    """Run one ingestion pass over all configured feeds now"""
+    await news_ingester.run_scheduled()
+    return {"success": True, "sources": news_ingester.status()}
+
+@api_router.get("/admin/news/status")
+async def get_news_ingest_status(_: dict = Depends(require_admin)):
+    """Per-source fetch metrics and backoff state"""
+    return news_ingester.status()
+
+# ==================== Public Stats ====================
+
+PUBLIC_STATS_SECONDS = float(os.environ.get('PUBLIC_STATS_SECONDS', '300'))
+
+class StatsSnapshot:
+    """Homepage totals, recomputed by the refresh_public_stats job so public page views never touch the database"""
+    def __init__(self):
+        self.value: Optional[PublicStats] = None
+
+    async def refresh(self) -> PublicStats:
+        # Collection metadata counts: O(1) and plenty accurate for marketing copy
+        users, courses = await asyncio.gather(db.users.estimated_document_count(), db.courses.estimated_document_count())
+        self.value = PublicStats(total_users=users, total_courses=courses,
+                                 updated_at=datetime.now(timezone.utc).isoformat())
+        return self.value
+
+    async def get(self) -> PublicStats:
+        return self.value or await self.refresh()
+
+public_stats = StatsSnapshot()
+
+@api_router.get("/stats/public", response_model=PublicStats)
+async def get_public_stats(response: Response):
+    """Member and course totals for the homepage, served from memory"""
+    response.headers["Cache-Control"] = "public, max-age=60"
+    return await public_stats.get()
 
 # ==================== Admin Analytics Routes ====================
 
 @api_router.get("/admin/analytics/content")
-async def get_content_analytics():
+async def get_content_analytics(_: dict = Depends(require_admin)):
     """Get content analytics - courses, episodes, resources count"""
     return {
         "total_users": await db.users.count_documents({}),
@@ -466,12 +1652,209 @@ async def get_content_analytics():
         }
     }
 
-# ==================== Contact Form ====================
+# ==================== Contact Submissions ====================
+
+CONTACT_RECIPIENT_EMAIL = os.environ.get('CONTACT_RECIPIENT_EMAIL', 'info@toddkroberson.com')
+CONTACT_QUEUE_SIZE = int(os.environ.get('CONTACT_QUEUE_SIZE', '1000'))
+CONTACT_BATCH_SIZE = 100
+CONTACT_FLUSH_SECONDS = 0.05
+
+SMTP_HOST = os.environ.get('SMTP_HOST')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', '587'))
+SMTP_USERNAME = os.environ.get('SMTP_USERNAME')
+SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD')
+SMTP_USE_TLS = os.environ.get('SMTP_USE_TLS', 'true').lower() == 'true'
+SMTP_FROM_EMAIL = os.environ.get('SMTP_FROM_EMAIL', 'no-reply@toddkroberson.com')
+NOTIFY_MAX_ATTEMPTS = int(os.environ.get('NOTIFY_MAX_ATTEMPTS', '6'))
+NOTIFY_BACKOFF_SECONDS = 30
+NOTIFY_POLL_SECONDS = 10
+NOTIFY_CLAIM_TIMEOUT = timedelta(minutes=5)
+
+class BatchWriter:
+    """Bounded in-process write queue flushed with insert_many.
+
+    enqueue() resolves once the batch holding the document has been committed,
+    so callers still only acknowledge durable writes, but concurrent requests
+    share one round trip instead of paying for one insert each.
+    """
+    def __init__(self, max_size: int, batch_size: int, flush_seconds: float, on_flush=None):
+        self.queue = asyncio.Queue(maxsize=max_size)
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.on_flush = on_flush
+        self._task = None
+
+    async def enqueue(self, collection, document: dict):
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        # Raises asyncio.QueueFull when the buffer is saturated; callers shed load
+        self.queue.put_nowait((collection, document, future))
+        await future
+
+    async def _flush(self, batch):
+        by_collection = defaultdict(list)
+        for item in batch:
+            by_collection[(item[0].database.name, item[0].name)].append(item)
+        for items in by_collection.values():
+            collection = items[0][0]
+            try:
+                await collection.insert_many([document for _, document, _ in items], ordered=False)
+                for _, _, future in items:
+                    if not future.done():
+                        future.set_result(True)
+            except Exception as e:
+                for _, _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+        if self.on_flush:
+            self.on_flush()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        batch = []
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        if batch:
+            await self._flush(batch)
+
+class ContactNotifier:
+    """Background worker that emails new contact submissions to the recipient.
 
-@api_router.post("/contact")
+    Pending notifications live on the submission documents themselves. Each one
+    is claimed atomically so only one worker sends it; failures are retried with
+    exponential backoff and, after max_attempts, copied to the
+    contact_notifications_dead collection for manual follow-up.
+    """
+    def __init__(self, host: Optional[str], port: int, username: Optional[str] = None, password: Optional[str] = None,
+                 use_tls: bool = True, from_email: str = SMTP_FROM_EMAIL, max_attempts: int = NOTIFY_MAX_ATTEMPTS,
+                 backoff_seconds: float = NOTIFY_BACKOFF_SECONDS):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.from_email = from_email
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.wakeup = asyncio.Event()
+        self._task = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.host)
+
+    def _send(self, submission: dict):
+        message = EmailMessage()
+        message["From"] = self.from_email
+        message["To"] = submission["recipient_email"]
+        message["Reply-To"] = submission["email"]
+        message["Subject"] = f"[Contact] {submission['subject']}"
+        message.set_content(
+            f"From: {submission['name']} <{submission['email']}>\n"
+            f"Received: {submission['created_at']}\n\n{submission['message']}"
+        )
+        with smtplib.SMTP(self.host, self.port, timeout=15) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+
+    async def _claim(self):
+        now = datetime.now(timezone.utc)
+        return await db.contact_submissions.find_one_and_update(
+            {"$or": [
+                {"notification.status": "pending", "notification.next_attempt_at": {"$lte": now.isoformat()}},
+                {"notification.status": "sending", "notification.claimed_at": {"$lte": (now - NOTIFY_CLAIM_TIMEOUT).isoformat()}}
+            ]},
+            {"$set": {"notification.status": "sending", "notification.claimed_at": now.isoformat()}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def process_due(self) -> int:
+        """Send every notification that is due; returns how many were attempted"""
+        attempted = 0
+        while (submission := await self._claim()) is not None:
+            attempted += 1
+            attempts = submission["notification"].get("attempts", 0) + 1
+            try:
+                await asyncio.to_thread(self._send, submission)
+                await db.contact_submissions.update_one(
+                    {"id": submission["id"]},
+                    {"$set": {"notification.status": "sent", "notification.attempts": attempts,
+                              "notification.sent_at": datetime.now(timezone.utc).isoformat()}}
+                )
+            except Exception as e:
+                if attempts >= self.max_attempts:
+                    await db.contact_notifications_dead.insert_one({
+                        "submission_id": submission["id"],
+                        "submission": submission,
+                        "attempts": attempts,
+                        "last_error": str(e)[:500],
+                        "failed_at": datetime.now(timezone.utc).isoformat()
+                    })
+                    update = {"notification.status": "dead"}
+                    logger.error(f"Contact notification {submission['id']} dead-lettered after {attempts} attempts: {str(e)}")
+                else:
+                    retry_at = datetime.now(timezone.utc) + timedelta(seconds=self.backoff_seconds * 2 ** (attempts - 1))
+                    update = {"notification.status": "pending", "notification.next_attempt_at": retry_at.isoformat()}
+                    logger.warning(f"Contact notification {submission['id']} failed (attempt {attempts}): {str(e)}")
+                update.update({"notification.attempts": attempts, "notification.last_error": str(e)[:500]})
+                await db.contact_submissions.update_one({"id": submission["id"]}, {"$set": update})
+        return attempted
+
+    async def _run(self):
+        while True:
+            try:
+                await self.process_due()
+            except Exception as e:
+                logger.error(f"Contact notifier error: {str(e)}")
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), NOTIFY_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+contact_notifier = ContactNotifier(SMTP_HOST, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SMTP_USE_TLS)
+contact_writer = BatchWriter(CONTACT_QUEUE_SIZE, CONTACT_BATCH_SIZE, CONTACT_FLUSH_SECONDS, on_flush=contact_notifier.wakeup.set)
+
+@api_router.post("/contact", dependencies=[Depends(rate_limit("contact"))])
 async def submit_contact_form(form: ContactForm):
-    """Submit contact form - stores in database for admin review"""
+    """Submit contact form - stored for admin review and emailed to the recipient in the background"""
+    await rate_limiter.check("contact", "email", form.email)
     try:
+        now = datetime.now(timezone.utc).isoformat()
         contact_data = {
             "id": str(uuid.uuid4()),
             "name": form.name,
@@ -479,21 +1862,22 @@ async def submit_contact_form(form: ContactForm):
             "subject": form.subject,
             "message": form.message,
             "status": "new",
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "recipient_email": "info@toddkroberson.com"
+            "created_at": now,
+            "recipient_email": CONTACT_RECIPIENT_EMAIL
         }
-        
-        await db.contact_submissions.insert_one(contact_data)
-        
-        # Note: In production, integrate with email service (SendGrid, AWS SES, etc.)
-        # to actually send emails to info@toddkroberson.com
-        # For now, submissions are stored in MongoDB for admin review
+        if contact_notifier.enabled:
+            contact_data["notification"] = {"status": "pending", "attempts": 0, "next_attempt_at": now}
+
+        # Returns once the batch holding this submission is committed; email goes out afterwards
+        await contact_writer.enqueue(db.contact_submissions, contact_data)
         
         return {
             "success": True,
             "message": "Thank you for your message. We will get back to you soon!",
             "submission_id": contact_data["id"]
         }
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Too many submissions right now, please retry shortly", headers={"Retry-After": "5"})
     except Exception as e:
         logging.error(f"Error submitting contact form: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to submit contact form")
@@ -515,7 +1899,7 @@ async def admin_login(login_data: AdminLogin):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     # Create admin token
-    token = create_jwt_token("admin", admin_email)
+    token = create_jwt_token("admin", admin_email, role="admin")
     
     return {
         "token": token,
@@ -597,6 +1981,9 @@ async def update_podcast_episodes(episodes: List[PodcastEpisodeUpdate]):
         
         if new_episodes:
             await db.podcast_episodes.insert_many(new_episodes)
+        await reindex_search("podcast")
+        invalidation_bus.publish("search", "podcast")
+        invalidation_bus.publish("bundles")
         
         return {"success": True, "message": f"Updated {len(new_episodes)} episodes"}
     except Exception as e:
@@ -626,6 +2013,8 @@ async def update_content_section(section: str, content: dict):
             {"$set": {"section": section, "data": content, "updated_at": datetime.now(timezone.utc).isoformat()}},
             upsert=True
         )
+        # Admins expect their edit on the next page load, not after the bundle goes stale
+        invalidation_bus.publish("bundles")
         return {"success": True, "message": f"Updated {section}"}
     except Exception as e:
         logging.error(f"Error updating content: {str(e)}")
@@ -645,42 +2034,2124 @@ async def get_public_content(section: str):
         return {"section": section, "data": {}}
     return {"section": content["section"], "data": content.get("data", {})}
 
-# ==================== Root Route ====================
+# ==================== Catalog Import ====================
 
-@api_router.get("/")
-async def root():
-    return {"message": "TKR Coaching API - Transform Your Real Estate Career"}
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '500'))
+IMPORT_MAX_LINE_BYTES = 1024 * 1024
+IMPORT_MAX_ERRORS = 1000
+IMPORT_MODELS = {"course": Course, "lesson": Lesson, "resource": Resource}
+IMPORT_COLLECTIONS = {"course": "courses", "lesson": "lessons", "resource": "resources"}
 
-# Include router
-app.include_router(api_router)
+async def ndjson_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """(line number, raw line) for each non-blank line; None for lines over IMPORT_MAX_LINE_BYTES"""
+    buffer = b""
+    line_no = 0
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if skipping:
+                # Tail of an oversized line that was already reported
+                skipping = False
+                continue
+            if line.strip():
+                yield line_no, line if len(line) <= IMPORT_MAX_LINE_BYTES else None
+        if len(buffer) > IMPORT_MAX_LINE_BYTES:
+            if not skipping:
+                yield line_no + 1, None
+            skipping = True
+            buffer = b""
+    if buffer.strip() and not skipping:
+        yield line_no + 1, buffer
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def import_operation(kind: str, record) -> UpdateOne:
+    """Upsert by id when the record has one, else by its natural key (title, or course_id + order)"""
+    explicit = record.model_fields_set
+    doc = record.model_dump()
+    if "created_at" in doc:
+        doc["created_at"] = doc["created_at"].isoformat()
+    if kind == "course":
+        doc["tier_rank"] = tier_rank(doc["tier"])
+    elif kind == "resource":
+        doc["tier_rank"] = tier_rank(doc["tier_required"])
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+    if "id" in explicit:
+        key = {"id": doc["id"]}
+    elif kind == "lesson":
+        key = {"course_id": doc["course_id"], "order": doc["order"]}
+    else:
+        key = {"title": doc["title"]}
+    on_insert = {"id": doc.pop("id")}
+    if "created_at" in doc and "created_at" not in explicit:
+        on_insert["created_at"] = doc.pop("created_at")
+    return UpdateOne(key, {"$set": doc, "$setOnInsert": on_insert}, upsert=True)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    if client:
-        client.close()
+class CatalogImport:
+    """Streams an NDJSON body of courses, lessons and resources into MongoDB.
 
-@app.on_event("startup")
-async def startup_check_db():
-    """Check database connection on startup"""
-    if db is None:
-        logger.error("Database not initialized - some features may not work")
-        return
-    
-    try:
+    Each line is {"type": "course" | "lesson" | "resource", ...model fields}.
+    Lines are validated a batch at a time in a worker thread while the
+    previous batch is being written, so at most two batches are in memory.
+    Writes are unordered upserts; per-record failures go to the report.
+    """
+
+    def __init__(self, dry_run: bool = False, batch_size: int = IMPORT_BATCH_SIZE):
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.course_ids = set()  # ids of courses seen in this import, so lessons may follow them
+        self.written_kinds = set()
+        self.written_courses = {"id": set(), "title": set()}  # upsert keys, to find the changed courses afterwards
+        self.report = CatalogImportReport(dry_run=dry_run, received=0, valid=0, errors=[])
+
+    def fail(self, line: int, error: str, kind: Optional[str] = None, record_id: Optional[str] = None):
+        self.report.failed += 1
+        if len(self.report.errors) >= IMPORT_MAX_ERRORS:
+            self.report.errors_truncated = True
+            return
+        self.report.errors.append(CatalogImportIssue(line=line, type=kind, id=record_id, error=error))
+
+    @staticmethod
+    def validate_batch(batch: List[Tuple[int, Optional[bytes]]]) -> Tuple[list, list]:
+        """Parse and validate one batch into (line, type, record) and (line, error, type, id) lists.
+
+        Runs in a worker thread, so it only returns results and never touches shared state.
+        """
+        valid, issues = [], []
+        for line, raw in batch:
+            if raw is None:
+                issues.append((line, f"Line exceeds {IMPORT_MAX_LINE_BYTES} bytes", None, None))
+                continue
+            try:
+                data = json.loads(raw)
+            except ValueError as e:
+                issues.append((line, f"Invalid JSON: {e}", None, None))
+                continue
+            if not isinstance(data, dict):
+                issues.append((line, "Expected a JSON object", None, None))
+                continue
+            kind = data.get("type")
+            record_id = data.get("id") if isinstance(data.get("id"), str) else None
+            model = IMPORT_MODELS.get(kind)
+            if model is None:
+                issues.append((line, f"Unknown type {kind!r}, expected one of {sorted(IMPORT_MODELS)}", None, record_id))
+                continue
+            try:
+                record = model.model_validate(data)
+            except ValidationError as e:
+                details = "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+                issues.append((line, details, kind, record_id))
+                continue
+            tier = record.tier if kind == "course" else getattr(record, "tier_required", None)
+            if kind != "lesson" and tier not in TIER_RANK:
+                issues.append((line, f"Unknown tier {tier!r}", kind, record_id))
+                continue
+            valid.append((line, kind, record))
+        return valid, issues
+
+    async def validate(self, batch: List[Tuple[int, Optional[bytes]]]) -> list:
+        valid, issues = await asyncio.to_thread(self.validate_batch, batch)
+        for line, error, kind, record_id in issues:
+            self.fail(line, error, kind, record_id)
+        self.course_ids.update(r.id for _, kind, r in valid if kind == "course" and "id" in r.model_fields_set)
+        return valid
+
+    async def check_lesson_courses(self, records: List[Tuple[int, str, BaseModel]]) -> List[Tuple[int, str, BaseModel]]:
+        """Drop lessons whose course is neither in this import nor in the database"""
+        missing = {r.course_id for _, kind, r in records if kind == "lesson" and r.course_id not in self.course_ids}
+        if missing:
+            async for course in db.courses.find({"id": {"$in": list(missing)}}, {"_id": 0, "id": 1}):
+                self.course_ids.add(course["id"])
+        kept = []
+        for line, kind, record in records:
+            if kind == "lesson" and record.course_id not in self.course_ids:
+                self.fail(line, f"Unknown course_id {record.course_id!r}", kind, record.id)
+            else:
+                kept.append((line, kind, record))
+        return kept
+
+    async def write_batch(self, records: List[Tuple[int, str, BaseModel]]):
+        records = await self.check_lesson_courses(records)
+        self.report.valid += len(records)
+        if self.dry_run or not records:
+            return
+        by_kind = defaultdict(list)
+        for line, kind, record in records:
+            by_kind[kind].append((line, record))
+        await asyncio.gather(*(self.write_kind(kind, items) for kind, items in by_kind.items()))
+
+    async def write_kind(self, kind: str, items: List[Tuple[int, BaseModel]]):
+        operations = [import_operation(kind, record) for _, record in items]
+        if kind == "course":
+            for _, record in items:
+                key = "id" if "id" in record.model_fields_set else "title"
+                self.written_courses[key].add(getattr(record, key))
+        try:
+            result = (await db[IMPORT_COLLECTIONS[kind]].bulk_write(operations, ordered=False)).bulk_api_result
+        except BulkWriteError as e:
+            result = e.details
+            for error in result.get("writeErrors", []):
+                line, record = items[error["index"]]
+                self.report.valid -= 1
+                self.fail(line, error.get("errmsg", "Write failed"), kind, record.id)
+        self.written_kinds.add(kind)
+        self.report.inserted += result.get("nUpserted", 0)
+        self.report.updated += result.get("nModified", 0)
+        self.report.unchanged += result.get("nMatched", 0) - result.get("nModified", 0)
+
+    async def run(self, chunks: AsyncIterator[bytes]) -> CatalogImportReport:
+        pending = None
+        batch = []
+        try:
+            async for item in ndjson_lines(chunks):
+                self.report.received += 1
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    valid = await self.validate(batch)
+                    batch = []
+                    if pending is not None:
+                        await pending
+                    pending = asyncio.create_task(self.write_batch(valid))
+            valid = await self.validate(batch)
+            if pending is not None:
+                await pending
+            await self.write_batch(valid)
+        finally:
+            if pending is not None and not pending.done():
+                pending.cancel()
+            await self.publish()
+        return self.report
+
+    async def publish(self):
+        if not self.written_kinds:
+            return
+        # Course detail and lesson caches are evicted along with the catalog
+        invalidate_catalog()
+        invalidation_bus.publish("bundles")
+        for kind in self.written_kinds & {"course", "resource"}:
+            await reindex_search(kind)
+            invalidation_bus.publish("search", kind)
+        if "course" in self.written_kinds:
+            await rebuild_suggest_index()
+            changed = await db.courses.find(
+                {"$or": [{field: {"$in": list(values)}} for field, values in self.written_courses.items()]}, {"_id": 0, "id": 1}
+            ).to_list(None)
+            await related_courses_changed([c["id"] for c in changed])
+
+@api_router.post("/admin/import/catalog", response_model=CatalogImportReport)
+async def import_catalog(request: Request, dry_run: bool = False, _: dict = Depends(require_admin)):
+    """Bulk upsert courses, lessons and resources from an application/x-ndjson body"""
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    report = await CatalogImport(dry_run=dry_run).run(request.stream())
+    logger.info(f"Catalog import{' (dry run)' if dry_run else ''}: {report.received} received, "
+                f"{report.inserted} inserted, {report.updated} updated, {report.failed} failed")
+    return report
+
+# ==================== Search ====================
+
+SEARCH_TOKEN_RE = re.compile(r"[a-z0-9]+")
+SEARCH_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is",
+    "it", "of", "on", "or", "that", "the", "this", "to", "what", "with", "you", "your"
+})
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in SEARCH_TOKEN_RE.findall(text.lower()) if t not in SEARCH_STOPWORDS]
+
+class SearchIndex:
+    """In-process BM25 inverted index over courses, resources, podcast, news and community posts.
+
+    Every document owns an integer slot; per-slot lengths and facet codes live in
+    NumPy arrays so a query scores, filters and facets all matches vectorized.
+    """
+    K1 = 1.2
+    B = 0.75
+    TITLE_WEIGHT = 2
+
+    def __init__(self):
+        self.postings = defaultdict(dict)  # term -> {slot: weighted term frequency}
+        self._posting_arrays = {}  # term -> (slots, tfs) arrays, dropped when the term changes
+        self.slots = {}  # (doc_type, doc_id) -> slot
+        self.docs = []  # slot -> stored hit fields plus "terms", or None when free
+        self.free_slots = []
+        self.lengths = np.zeros(0, dtype=np.float64)
+        self.type_codes = np.full(0, -1, dtype=np.int16)
+        self.tier_codes = np.full(0, -1, dtype=np.int16)
+        self.type_names = []
+        self.tier_names = []
+        self.total_length = 0
+        self.n_docs = 0
+
+    def _code(self, names: List[str], value: str) -> int:
+        if value not in names:
+            names.append(value)
+        return names.index(value)
+
+    def _allocate_slot(self) -> int:
+        if self.free_slots:
+            return self.free_slots.pop()
+        slot = len(self.docs)
+        self.docs.append(None)
+        if slot >= len(self.lengths):
+            size = max(1024, 2 * len(self.lengths))
+            self.lengths = np.resize(self.lengths, size)
+            self.type_codes = np.resize(self.type_codes, size)
+            self.tier_codes = np.resize(self.tier_codes, size)
+            self.lengths[slot:] = 0
+            self.type_codes[slot:] = -1
+            self.tier_codes[slot:] = -1
+        return slot
+
+    def upsert(self, doc_type: str, doc_id: str, title: str, body: List[str], tier: str, snippet: str):
+        self.remove(doc_type, doc_id)
+
+        frequencies = defaultdict(int)
+        for term in tokenize(title):
+            frequencies[term] += self.TITLE_WEIGHT
+        for text in body:
+            for term in tokenize(text or ""):
+                frequencies[term] += 1
+
+        slot = self._allocate_slot()
+        self.slots[(doc_type, doc_id)] = slot
+        for term, tf in frequencies.items():
+            self.postings[term][slot] = tf
+            self._posting_arrays.pop(term, None)
+        length = sum(frequencies.values())
+        self.docs[slot] = {
+            "type": doc_type,
+            "id": doc_id,
+            "title": title,
+            "snippet": (snippet or "")[:160],
+            "tier": tier or "free",
+            "terms": tuple(frequencies)
+        }
+        self.lengths[slot] = length
+        self.type_codes[slot] = self._code(self.type_names, doc_type)
+        self.tier_codes[slot] = self._code(self.tier_names, tier or "free")
+        self.total_length += length
+        self.n_docs += 1
+
+    def remove(self, doc_type: str, doc_id: str):
+        slot = self.slots.pop((doc_type, doc_id), None)
+        if slot is None:
+            return
+        for term in self.docs[slot]["terms"]:
+            postings = self.postings[term]
+            postings.pop(slot, None)
+            self._posting_arrays.pop(term, None)
+            if not postings:
+                del self.postings[term]
+        self.total_length -= self.lengths[slot]
+        self.n_docs -= 1
+        self.docs[slot] = None
+        self.lengths[slot] = 0
+        self.type_codes[slot] = -1
+        self.tier_codes[slot] = -1
+        self.free_slots.append(slot)
+
+    def remove_type(self, doc_type: str):
+        for key in [k for k in self.slots if k[0] == doc_type]:
+            self.remove(*key)
+
+    def _posting_array(self, term: str):
+        arrays = self._posting_arrays.get(term)
+        if arrays is None:
+            postings = self.postings[term]
+            arrays = (np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                      np.fromiter(postings.values(), dtype=np.float64, count=len(postings)))
+            self._posting_arrays[term] = arrays
+        return arrays
+
+    def search(self, query: str, doc_type: Optional[str] = None, tier: Optional[str] = None,
+               skip: int = 0, limit: int = 20):
+        """Return (total, hits, facets). Facets count every match; type/tier filter the hits."""
+        terms = [t for t in set(tokenize(query)) if t in self.postings]
+        if not terms or not self.n_docs:
+            return 0, [], {"type": {}, "tier": {}}
+
+        size = len(self.docs)
+        lengths = self.lengths[:size]
+        norms = self.K1 * (1 - self.B + self.B * lengths / (self.total_length / self.n_docs))
+        scores = np.zeros(size, dtype=np.float64)
+        for term in terms:
+            slots, tfs = self._posting_array(term)
+            idf = math.log(1 + (self.n_docs - len(slots) + 0.5) / (len(slots) + 0.5))
+            scores[slots] += idf * tfs * (self.K1 + 1) / (tfs + norms[slots])
+
+        matched = scores > 0
+        type_codes = self.type_codes[:size]
+        tier_codes = self.tier_codes[:size]
+        facets = {
+            "type": self._facet(type_codes[matched], self.type_names),
+            "tier": self._facet(tier_codes[matched], self.tier_names)
+        }
+        if doc_type:
+            matched &= type_codes == (self.type_names.index(doc_type) if doc_type in self.type_names else -2)
+        if tier:
+            matched &= tier_codes == (self.tier_names.index(tier) if tier in self.tier_names else -2)
+
+        candidates = np.flatnonzero(matched)
+        total = len(candidates)
+        wanted = min(skip + limit, total)
+        if wanted <= skip:
+            return total, [], facets
+        candidate_scores = scores[candidates]
+        if wanted < total:
+            top = np.argpartition(-candidate_scores, wanted - 1)[:wanted]
+        else:
+            top = np.arange(total)
+        top = top[np.argsort(-candidate_scores[top], kind="stable")][skip:wanted]
+
+        hits = []
+        for i in top:
+            doc = self.docs[candidates[i]]
+            hits.append(SearchHit(score=round(float(candidate_scores[i]), 4),
+                                  **{f: doc[f] for f in ("type", "id", "title", "snippet", "tier")}))
+        return total, hits, facets
+
+    @staticmethod
+    def _facet(codes, names: List[str]) -> Dict[str, int]:
+        if not len(codes):
+            return {}
+        counts = np.bincount(codes, minlength=len(names))
+        return {names[i]: int(c) for i, c in enumerate(counts) if c}
+
+search_index = Lazy("search_index", SearchIndex)
+
+# Collection, index type, and how to turn a stored document into index fields
+SEARCH_SOURCES = {
+    "course": ("courses", lambda d: (d["title"], [d.get("description"), d.get("instructor"), d.get("category")], d.get("tier"), d.get("description"))),
+    "resource": ("resources", lambda d: (d["title"], [d.get("description"), d.get("resource_type")], d.get("tier_required"), d.get("description"))),
+    "podcast": ("podcast_episodes", lambda d: (d["title"], [d.get("description")], "free", d.get("description"))),
+    "news": ("news_articles", lambda d: (d["title"], [d.get("excerpt"), d.get("source")], "free", d.get("excerpt"))),
+    "community": ("community_posts", lambda d: (d["title"], [d.get("content"), d.get("user_name")], "free", d.get("content"))),
+}
+
+def index_document(doc_type: str, doc: dict):
+    title, body, tier, snippet = SEARCH_SOURCES[doc_type][1](doc)
+    search_index.upsert(doc_type, doc["id"], title, body, tier, snippet)
+
+async def reindex_search(doc_type: str):
+    """Rebuild one document type of the search index from MongoDB"""
+    collection = SEARCH_SOURCES[doc_type][0]
+    search_index.remove_type(doc_type)
+    async for doc in db[collection].find({}, {"_id": 0}):
+        index_document(doc_type, doc)
+
+@api_router.get("/search", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    type: Optional[str] = None,
+    tier: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100)
+):
+    """Ranked full-text search across the catalog, faceted by type and tier"""
+    total, hits, facets = search_index.search(q, doc_type=type, tier=tier, skip=(page - 1) * page_size, limit=page_size)
+    return SearchResponse(query=q, total=total, page=page, page_size=page_size, results=hits, facets=facets)
+
+# ==================== Course Suggestions ====================
+
+def normalize_suggestion(text: str) -> str:
+    return " ".join(SEARCH_TOKEN_RE.findall(text.lower()))
+
+def within_one_edit(a: str, b: str) -> bool:
+    """True when a and b differ by at most one insert, delete, substitution or adjacent transposition"""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return (a[i + 1:] == b[i + 1:]
+                or (i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]))
+    if len(a) > len(b):
+        return a[i + 1:] == b[i:]
+    return a[i:] == b[i + 1:]
+
+class SuggestIndex:
+    """In-memory typeahead index over course titles, instructors and categories.
+
+    Every word-start of a suggestion is stored as a key in one sorted list, so a
+    prefix lookup is a bisect. Short key prefixes are also indexed by their
+    single-character deletions, which finds one-typo matches without scanning.
+    """
+    KIND_RANK = {"title": 0, "instructor": 1, "category": 2}
+    FUZZY_MIN = 3
+    FUZZY_MAX = 8
+
+    def __init__(self):
+        self.keys = []  # sorted (key, suggestion_id)
+        self.suggestions = {}  # suggestion_id -> {"text", "key", "type", "course_id", "courses"}
+        self.course_suggestions = defaultdict(set)  # course_id -> suggestion ids it contributes to
+        self.deletes = defaultdict(set)  # deletion variant of a key prefix -> {(key, suggestion_id)}
+
+    @staticmethod
+    def _deletions(text: str) -> set:
+        return {text} | {text[:i] + text[i + 1:] for i in range(len(text))}
+
+    def _key_entries(self, text: str):
+        words = normalize_suggestion(text).split()
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+    def _add_suggestion(self, suggestion_id, text, kind, course_id):
+        for key in self._key_entries(text):
+            bisect.insort(self.keys, (key, suggestion_id))
+            for length in range(self.FUZZY_MIN, self.FUZZY_MAX + 2):
+                if length > len(key):
+                    break
+                for variant in self._deletions(key[:length]):
+                    self.deletes[variant].add((key, suggestion_id))
+        self.suggestions[suggestion_id] = {
+            "text": text, "key": normalize_suggestion(text), "type": kind, "course_id": course_id, "courses": set()
+        }
+
+    def _drop_suggestion(self, suggestion_id):
+        suggestion = self.suggestions.pop(suggestion_id)
+        for key in self._key_entries(suggestion["text"]):
+            i = bisect.bisect_left(self.keys, (key, suggestion_id))
+            if i < len(self.keys) and self.keys[i] == (key, suggestion_id):
+                del self.keys[i]
+            for length in range(self.FUZZY_MIN, self.FUZZY_MAX + 2):
+                if length > len(key):
+                    break
+                for variant in self._deletions(key[:length]):
+                    entries = self.deletes.get(variant)
+                    if entries:
+                        entries.discard((key, suggestion_id))
+                        if not entries:
+                            del self.deletes[variant]
+
+    def remove_course(self, course_id: str):
+        for suggestion_id in self.course_suggestions.pop(course_id, set()):
+            suggestion = self.suggestions[suggestion_id]
+            suggestion["courses"].discard(course_id)
+            if not suggestion["courses"]:
+                self._drop_suggestion(suggestion_id)
+
+    def upsert_course(self, course: dict):
+        self.remove_course(course["id"])
+        fields = [("title", course.get("title"), course["id"]),
+                  ("instructor", course.get("instructor"), None),
+                  ("category", course.get("category"), None)]
+        for kind, text, course_id in fields:
+            if not text or not normalize_suggestion(text):
+                continue
+            # Titles are per course; instructors and categories are shared by every course using them
+            suggestion_id = (kind, course_id or normalize_suggestion(text))
+            if suggestion_id not in self.suggestions:
+                self._add_suggestion(suggestion_id, text, kind, course_id)
+            self.suggestions[suggestion_id]["courses"].add(course["id"])
+            self.course_suggestions[course["id"]].add(suggestion_id)
+
+    def clear(self):
+        self.__init__()
+
+    def suggest(self, query: str, limit: int = 8) -> List[CourseSuggestion]:
+        q = normalize_suggestion(query)
+        if not q:
+            return []
+
+        found = {}
+        i = bisect.bisect_left(self.keys, (q,))
+        while i < len(self.keys) and self.keys[i][0].startswith(q):
+            key, suggestion_id = self.keys[i]
+            # Matches at the start of the suggestion outrank matches on a later word
+            rank = (0, key != self.suggestions[suggestion_id]["key"])
+            found[suggestion_id] = min(rank, found.get(suggestion_id, rank))
+            i += 1
+
+        if len(found) < limit and len(q) >= self.FUZZY_MIN:
+            head = q[:self.FUZZY_MAX]
+            for variant in self._deletions(head):
+                for key, suggestion_id in self.deletes.get(variant, ()):
+                    if suggestion_id in found:
+                        continue
+                    if any(within_one_edit(q, key[:n]) for n in (len(q) - 1, len(q), len(q) + 1)):
+                        found[suggestion_id] = (1, 0)
+
+        ranked = sorted(
+            found.items(),
+            key=lambda item: (item[1], self.KIND_RANK[item[0][0]], len(self.suggestions[item[0]]["text"]))
+        )[:limit]
+        return [
+            CourseSuggestion(text=self.suggestions[sid]["text"], type=sid[0], course_id=self.suggestions[sid]["course_id"])
+            for sid, _ in ranked
+        ]
+
+suggest_index = SuggestIndex()
+
+def index_course(course: dict):
+    """Refresh the in-memory search, suggestion and related-course indexes after a course write"""
+    index_document("course", course)
+    suggest_index.upsert_course(course)
+    if not related_courses.upsert(course):
+        asyncio.get_running_loop().create_task(rebuild_related_courses())
+
+async def rebuild_suggest_index():
+    suggest_index.clear()
+    async for course in db.courses.find({}, {"_id": 0, "id": 1, "title": 1, "instructor": 1, "category": 1}):
+        suggest_index.upsert_course(course)
+
+# ==================== Related Courses ====================
+
+RELATED_TOP_K = int(os.environ.get('RELATED_TOP_K', '6'))
+RELATED_INCREMENTAL_MAX = 50  # changed courses above which one full rebuild is cheaper
+RELATED_CATEGORICAL = ("category", "difficulty", "tier", "instructor")
+# Relative pull of each feature block on the similarity
+RELATED_WEIGHTS = {"category": 3.0, "text": 2.0, "difficulty": 1.0, "instructor": 1.0, "tier": 0.5}
+RELATED_FIELDS = {"_id": 0, **{f: 1 for f in CourseCard.model_fields}, "description": 1}
+
+def course_terms(course: dict) -> List[str]:
+    return tokenize(course.get("title") or "") * 2 + tokenize(course.get("description") or "")
+
+class RelatedCourses:
+    """Precomputed top-k similar courses, served from memory.
+
+    A course's vector joins one-hot blocks for category, difficulty, tier
+    and instructor with a TF-IDF block over title and description. Each
+    block is L2-normalised and scaled by the square root of its weight, so
+    the dot product of two unit rows is the weighted mix of per-block
+    cosines. A rebuild scores every pair in one matrix product and takes
+    each row's top-k with argpartition. A single changed course costs one
+    matrix-vector product, and only rows whose lists it can enter or leave
+    are re-ranked. Vocabulary, IDF and categorical columns stay as of the
+    last rebuild; a course with an unseen category, level, tier or
+    instructor asks for a rebuild instead.
+    """
+    def __init__(self, k: int = RELATED_TOP_K):
+        self.k = k
+        self.ids: List[Optional[str]] = []  # row -> course id, None once removed
+        self.rows: Dict[str, int] = {}
+        self.cards: Dict[str, CourseCard] = {}
+        self.vectors = None  # unit feature rows, built on first rebuild
+        self.ranked: List[List[Tuple[int, float]]] = []  # row -> [(row, score)], best first
+        self.floor = None  # row -> score a course must beat to enter that row's list
+        self.listed_in = defaultdict(set)  # row -> rows whose lists contain it
+        self.related: Dict[str, List[RelatedCourse]] = {}  # course id -> served list
+        self.vocab: Dict[str, int] = {}
+        self.idf = None
+        self.columns: Dict[str, Dict[str, int]] = {}
+        self.built_at = None
+
+    def get(self, course_id: str) -> Optional[List[RelatedCourse]]:
+        return self.related.get(course_id)
+
+    def vectorize(self, courses: List[dict]):
+        blocks = {}
+        for field in RELATED_CATEGORICAL:
+            block = np.zeros((len(courses), len(self.columns[field])))
+            for i, course in enumerate(courses):
+                column = self.columns[field].get(course.get(field))
+                if column is not None:
+                    block[i, column] = 1.0
+            blocks[field] = block
+        text = np.zeros((len(courses), len(self.vocab)))
+        for i, course in enumerate(courses):
+            for term in course_terms(course):
+                column = self.vocab.get(term)
+                if column is not None:
+                    text[i, column] += 1.0
+        blocks["text"] = text * self.idf
+
+        def unit(matrix):
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+        return unit(np.hstack([unit(block) * math.sqrt(RELATED_WEIGHTS[field]) for field, block in blocks.items()]))
+
+    def rank(self, rows) -> None:
+        """Recompute the top-k lists of `rows` (an index array) in one vectorized pass"""
+        if len(rows) == 0:
+            return
+        scores = self.vectors[rows] @ self.vectors.T
+        scores[np.arange(len(rows)), rows] = -np.inf
+        k = min(self.k, scores.shape[1] - 1)
+        if k > 0:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+        for i, row in enumerate(rows):
+            for old, _ in self.ranked[row]:
+                self.listed_in[old].discard(row)
+            ranked = [(int(j), float(score)) for j, score in zip(top[i], top_scores[i]) if score > 1e-9] if k > 0 else []
+            self.ranked[row] = ranked
+            self.floor[row] = ranked[-1][1] if len(ranked) == self.k else 0.0
+            for j, _ in ranked:
+                self.listed_in[j].add(row)
+            self.materialize(row)
+
+    def materialize(self, row: int):
+        course_id = self.ids[row]
+        if course_id is None:
+            return
+        self.related[course_id] = [
+            RelatedCourse(**self.cards[self.ids[j]].model_dump(), score=round(score, 4)) for j, score in self.ranked[row]
+        ]
+
+    def rebuild(self, courses: List[dict]):
+        started = time.perf_counter()
+        self.columns = {
+            field: {value: i for i, value in enumerate(sorted({c.get(field) for c in courses if c.get(field)}))}
+            for field in RELATED_CATEGORICAL
+        }
+        document_frequency = Counter(term for course in courses for term in set(course_terms(course)))
+        self.vocab = {term: i for i, term in enumerate(sorted(document_frequency))}
+        # Smoothed IDF, so a term in every course still counts a little
+        self.idf = np.log((1 + len(courses)) / (1 + np.array([document_frequency[t] for t in self.vocab], dtype=np.float64))) + 1
+        self.ids = [c["id"] for c in courses]
+        self.rows = {course_id: row for row, course_id in enumerate(self.ids)}
+        self.cards = {c["id"]: CourseCard.model_validate(c) for c in courses}
+        self.vectors = self.vectorize(courses) if courses else np.zeros((0, 0))
+        self.ranked = [[] for _ in courses]
+        self.floor = np.zeros(len(courses))
+        self.listed_in = defaultdict(set)
+        self.related = {}
+        self.rank(np.arange(len(courses)))
+        self.built_at = datetime.now(timezone.utc).isoformat()
+        logger.info(f"Related courses built for {len(courses)} courses in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    def upsert(self, course: dict) -> bool:
+        """Apply one added or changed course; False if it needs a full rebuild"""
+        if self.vectors is None or any(course.get(f) and course.get(f) not in self.columns[f] for f in RELATED_CATEGORICAL):
+            return False
+        vector = self.vectorize([course])[0]
+        row = self.rows.get(course["id"])
+        if row is None:
+            row = len(self.ids)
+            self.ids.append(course["id"])
+            self.rows[course["id"]] = row
+            self.vectors = np.vstack([self.vectors, vector])
+            self.ranked.append([])
+            self.floor = np.append(self.floor, 0.0)
+        else:
+            self.vectors[row] = vector
+        self.cards[course["id"]] = CourseCard.model_validate(course)
+        self._propagate(row)
+        return True
+
+    def remove(self, course_id: str):
+        row = self.rows.pop(course_id, None)
+        if row is None:
+            return
+        # Tombstone: a zero vector scores 0 against everything and so drops out of every list
+        self.vectors[row] = 0.0
+        self.ids[row] = None
+        for j, _ in self.ranked[row]:
+            self.listed_in[j].discard(row)
+        self.ranked[row] = []
+        self.cards.pop(course_id, None)
+        self.related.pop(course_id, None)
+        self._propagate(row)
+
+    def _propagate(self, row: int):
+        scores = self.vectors @ self.vectors[row]
+        scores[row] = -np.inf
+        # Rows the course can now enter, plus rows that listed it and may need to re-rank or refresh its card
+        affected = set(np.flatnonzero(scores > self.floor).tolist()) | self.listed_in[row]
+        affected = [r for r in affected if self.ids[r] is not None]
+        if self.ids[row] is not None:
+            affected.append(row)
+        self.rank(np.array(sorted(set(affected)), dtype=np.int64))
+
+related_courses = RelatedCourses()
+
+async def rebuild_related_courses():
+    courses = await db.courses.find({}, RELATED_FIELDS).to_list(None)
+    related_courses.rebuild(courses)
+
+async def refresh_related_courses(course_ids: List[str]):
+    """Apply changed courses incrementally, falling back to one full rebuild when that is cheaper or required"""
+    if len(course_ids) > RELATED_INCREMENTAL_MAX:
+        return await rebuild_related_courses()
+    found = {c["id"]: c for c in await db.courses.find({"id": {"$in": course_ids}}, RELATED_FIELDS).to_list(None)}
+    for course_id in course_ids:
+        if course_id not in found:
+            related_courses.remove(course_id)
+        elif not related_courses.upsert(found[course_id]):
+            return await rebuild_related_courses()
+
+async def related_courses_changed(course_ids: List[str]):
+    """Refresh this worker's related lists, then have every other worker do the same"""
+    await refresh_related_courses(course_ids)
+    if len(course_ids) > RELATED_INCREMENTAL_MAX:
+        invalidation_bus.publish("related_courses")
+    else:
+        for course_id in course_ids:
+            invalidation_bus.publish("related_courses", course_id)
+
+def refresh_related_in_background(course_id: Optional[str]):
+    refresh = refresh_related_courses([course_id]) if course_id else rebuild_related_courses()
+    asyncio.get_running_loop().create_task(refresh)
+
+@api_router.get("/courses/{course_id}/related", response_model=List[RelatedCourse])
+async def get_related_courses(course_id: str, limit: int = Query(RELATED_TOP_K, ge=1, le=RELATED_TOP_K)):
+    """Most similar courses by category, level, tier, instructor and title/description text"""
+    related = related_courses.get(course_id)
+    if related is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    return related[:limit]
+
+# ==================== Live Updates (SSE) ====================
+
+LIVE_COLLECTIONS = ("community_posts", "page_content", "podcast_episodes")
+LIVE_STREAM_ID = "live_updates"
+SSE_CLIENT_QUEUE_SIZE = int(os.environ.get('SSE_CLIENT_QUEUE_SIZE', '100'))
+SSE_REPLAY_BUFFER_SIZE = int(os.environ.get('SSE_REPLAY_BUFFER_SIZE', '1000'))
+SSE_KEEPALIVE_SECONDS = 15
+RESUME_TOKEN_SAVE_SECONDS = 1.0
+
+class LiveClient:
+    def __init__(self, topics):
+        self.topics = topics
+        self.queue = asyncio.Queue(maxsize=SSE_CLIENT_QUEUE_SIZE)
+        self.evicted = asyncio.Event()
+
+class ChangeFeed:
+    """One MongoDB change stream per worker, fanned out to every connected SSE client.
+
+    Each client gets a bounded queue; a client that lets its queue fill up is
+    evicted rather than slowing everyone else down, and reconnects with
+    Last-Event-ID. Event ids are the change stream resume tokens, so they are
+    ordered and identical on every worker, and a bounded replay buffer lets a
+    reconnecting client pick up exactly where it left off. The resume token is
+    persisted so a restarted watcher continues from the last event it saw.
+    """
+    def __init__(self):
+        self.clients = set()
+        self.recent = deque(maxlen=SSE_REPLAY_BUFFER_SIZE)  # (event_id, collection, payload)
+        self.evictions = 0
+        self._task = None
+
+    def subscribe(self, topics, last_event_id: Optional[str] = None):
+        client = LiveClient(topics)
+        backlog = None
+        if last_event_id:
+            if self.recent and self.recent[0][0] <= last_event_id:
+                backlog = [e for e in self.recent if e[0] > last_event_id and e[1] in topics]
+            else:
+                backlog = None  # gap we cannot fill - tell the client to refetch
+        self.clients.add(client)
+        return client, backlog
+
+    def unsubscribe(self, client: LiveClient):
+        self.clients.discard(client)
+
+    def publish(self, event_id: str, collection: str, payload: str):
+        self.recent.append((event_id, collection, payload))
+        for client in list(self.clients):
+            if collection not in client.topics:
+                continue
+            try:
+                client.queue.put_nowait((event_id, collection, payload))
+            except asyncio.QueueFull:
+                self.clients.discard(client)
+                client.evicted.set()
+                self.evictions += 1
+
+    @staticmethod
+    def to_payload(change: dict) -> str:
+        document = change.get("fullDocument") or {}
+        document.pop("_id", None)
+        document.pop("password", None)
+        return json.dumps({
+            "collection": change["ns"]["coll"],
+            "operation": change["operationType"],
+            "id": document.get("id") or document.get("section"),
+            "document": document or None
+        }, default=str)
+
+    async def _watch(self):
+        state = await db.stream_resume_tokens.find_one({"_id": LIVE_STREAM_ID})
+        token = state["token"] if state else None
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": list(LIVE_COLLECTIONS)},
+            "operationType": {"$in": ["insert", "update", "replace", "delete"]}
+        }}]
+        retry_delay = 1
+        while True:
+            try:
+                async with db.watch(pipeline, full_document="updateLookup", resume_after=token) as stream:
+                    retry_delay = 1
+                    last_saved = 0.0
+                    async for change in stream:
+                        token = change["_id"]
+                        self.publish(token["_data"], change["ns"]["coll"], self.to_payload(change))
+                        now = asyncio.get_running_loop().time()
+                        if now - last_saved >= RESUME_TOKEN_SAVE_SECONDS:
+                            await db.stream_resume_tokens.update_one(
+                                {"_id": LIVE_STREAM_ID}, {"$set": {"token": token}}, upsert=True
+                            )
+                            last_saved = now
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Change stream interrupted, retrying in {retry_delay}s: {str(e)}")
+                if "resume" in str(e).lower():
+                    token = None  # token fell off the oplog; start from now
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 60)
+            finally:
+                if token:
+                    try:
+                        await db.stream_resume_tokens.update_one(
+                            {"_id": LIVE_STREAM_ID}, {"$set": {"token": token}}, upsert=True
+                        )
+                    except Exception:
+                        pass
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+change_feed = ChangeFeed()
+
+def format_sse(event_id: str, collection: str, payload: str) -> str:
+    return f"id: {event_id}\nevent: {collection}\ndata: {payload}\n\n"
+
+@api_router.get("/events/stream")
+async def stream_events(request: Request, topics: Optional[str] = None):
+    """Server-sent events for community posts, page content and podcast episodes"""
+    wanted = set(topics.split(",")) & set(LIVE_COLLECTIONS) if topics else set(LIVE_COLLECTIONS)
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    client, backlog = change_feed.subscribe(wanted, last_event_id)
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            if last_event_id and backlog is None:
+                yield "event: reset\ndata: {}\n\n"
+            for event in backlog or ():
+                yield format_sse(*event)
+            while not client.evicted.is_set():
+                try:
+                    event = await asyncio.wait_for(client.queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(*event)
+        finally:
+            change_feed.unsubscribe(client)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ==================== Page Bundles ====================
+
+BUNDLE_FRESH_SECONDS = float(os.environ.get('BUNDLE_FRESH_SECONDS', '30'))
+BUNDLE_STALE_SECONDS = float(os.environ.get('BUNDLE_STALE_SECONDS', '600'))  # serve stale this long while rebuilding
+
+class SWRCache:
+    """Stale-while-revalidate cache with single-flight rebuilds.
+
+    A fresh entry is returned as is. A stale one is returned immediately while
+    one background task rebuilds it; only a missing or fully expired entry
+    makes the caller wait, and concurrent callers share that one build.
+    """
+    def __init__(self, fresh_seconds: float, stale_seconds: float):
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self.entries = {}  # key -> (built_at, value)
+        self.builds = {}  # key -> in-flight build task
+
+    def _build(self, key, builder) -> asyncio.Task:
+        task = self.builds.get(key)
+        if task is None:
+            task = asyncio.create_task(self._store(key, builder))
+            task.add_done_callback(self._log_failure)
+            self.builds[key] = task
+        return task
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task):
+        # Background rebuilds have no awaiting caller; a failure keeps the stale entry in place
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Bundle rebuild failed: {str(task.exception())}")
+
+    async def _store(self, key, builder):
+        try:
+            value = await builder()
+            self.entries[key] = (time.monotonic(), value)
+            return value
+        finally:
+            self.builds.pop(key, None)
+
+    async def get(self, key, builder):
+        entry = self.entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.fresh_seconds:
+                return entry[1]
+            if age < self.fresh_seconds + self.stale_seconds:
+                self._build(key, builder)
+                return entry[1]
+        return await asyncio.shield(self._build(key, builder))
+
+    def invalidate(self, key=None):
+        if key is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(key, None)
+
+bundle_cache = SWRCache(BUNDLE_FRESH_SECONDS, BUNDLE_STALE_SECONDS)
+
+async def build_home_bundle() -> dict:
+    hero, stats, podcasts, posts = await asyncio.gather(
+        get_public_content("homepage_hero"),
+        public_stats.get(),
+        get_podcast_episodes(),
+        get_community_posts()
+    )
+    return {"hero": hero["data"], "stats": stats, "podcasts": podcasts[:3], "community_posts": posts[:2]}
+
+async def build_dashboard_bundle() -> dict:
+    courses, podcasts, posts = await asyncio.gather(get_courses(), get_podcast_episodes(), get_community_posts())
+    return {"courses": courses[:3], "podcasts": podcasts[:3], "community_posts": posts[:3]}
+
+@api_router.get("/bundle/home")
+async def get_home_bundle():
+    """Everything the homepage renders on load, in one response"""
+    return await bundle_cache.get("home", build_home_bundle)
+
+@api_router.get("/bundle/dashboard")
+async def get_dashboard_bundle(claims: dict = Depends(get_token_claims)):
+    """Shared dashboard content from the bundle cache plus the caller's own account and progress"""
+    shared, user, progress = await asyncio.gather(
+        bundle_cache.get("dashboard", build_dashboard_bundle),
+        get_current_user(claims),
+        get_my_progress(claims)
+    )
+    return {**shared, "user": await get_me(user), "progress": progress}
+
+# ==================== Cache Invalidation ====================
+
+INVALIDATION_BACKEND = os.environ.get('INVALIDATION_BACKEND', 'local')  # "local", "mongo" or "redis"
+INVALIDATION_COLLECTION = "cache_invalidations"
+INVALIDATION_CAPPED_BYTES = 4 * 1024 * 1024
+INVALIDATION_POLL_SECONDS = 0.25  # before re-opening a dead tailable cursor
+INVALIDATION_REPLAY_SECONDS = 2.0  # overlap when re-opening, so nothing between cursors is missed
+INVALIDATION_APPLIED_MAX = 10000  # (topic, key, origin) sequences remembered for dedupe
+INVALIDATION_CHANNEL = "tkr:cache-invalidations"
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+class InvalidationBus:
+    """Broadcasts cache invalidations to every worker.
+
+    publish() evicts in this process at once and queues the message. With the
+    "mongo" backend (tailing a capped collection) or "redis" (pub/sub) every
+    other worker applies it on receipt; "local" is for single-process runs.
+    Each worker numbers its messages with its own increasing sequence, and
+    a delivery is dropped as a replay only if that origin's sequence for the
+    (topic, key) was already applied, so clock skew between hosts never
+    suppresses an invalidation.
+    """
+    def __init__(self, backend: str = "local", origin: str = WORKER_ID):
+        self.backend = backend
+        self.origin = origin
+        self.handlers = defaultdict(list)  # topic -> [(handler, remote_only)]
+        self.sequence = itertools.count(1)
+        self.applied = OrderedDict()  # (topic, key, origin) -> last applied sequence, least recent first
+        self.outbox = deque()
+        self.lag_ms = deque(maxlen=1000)
+        self.metrics = {"published": 0, "received": 0, "applied": 0, "duplicates": 0, "errors": 0}
+        self._wake = None
+        self._tasks = []
+
+    def subscribe(self, topic: str, handler, remote_only: bool = False):
+        """handler(key) evicts; remote_only handlers skip invalidations this worker published itself"""
+        self.handlers[topic].append((handler, remote_only))
+
+    def publish(self, topic: str, key: Optional[str] = None):
+        message = {"topic": topic, "key": key, "seq": next(self.sequence),
+                   "origin": self.origin, "published_at": time.time()}
+        self.metrics["published"] += 1
+        self._apply(message, remote=False)
+        if self.backend != "local":
+            self.outbox.append(message)
+            if self._wake is not None:
+                self._wake.set()
+
+    def _is_duplicate(self, message: dict) -> bool:
+        applied = self.applied.get((message["topic"], message["key"], message["origin"]))
+        return applied is not None and applied >= message["seq"]
+
+    def _apply(self, message: dict, remote: bool):
+        applied_key = (message["topic"], message["key"], message["origin"])
+        self.applied[applied_key] = message["seq"]
+        self.applied.move_to_end(applied_key)
+        if len(self.applied) > INVALIDATION_APPLIED_MAX:
+            # Forgetting a sequence only risks re-applying an eviction, which is harmless
+            self.applied.popitem(last=False)
+        for handler, remote_only in self.handlers.get(message["topic"], []):
+            if remote or not remote_only:
+                try:
+                    handler(message["key"])
+                except Exception as e:
+                    self.metrics["errors"] += 1
+                    logger.error(f"Invalidation handler for {message['topic']} failed: {str(e)}")
+        self.metrics["applied"] += 1
+
+    def receive(self, message: dict):
+        if message.get("origin") == self.origin:
+            return
+        if not isinstance(message.get("seq"), int) or not {"topic", "key", "origin", "published_at"} <= set(message):
+            self.metrics["errors"] += 1
+            logger.warning(f"Dropping malformed invalidation: {message!r}")
+            return
+        if self._is_duplicate(message):
+            self.metrics["duplicates"] += 1
+            return
+        self.metrics["received"] += 1
+        self.lag_ms.append(max(0.0, (time.time() - message["published_at"]) * 1000))
+        self._apply(message, remote=True)
+
+    async def _send(self, messages: List[dict]):
+        if self.backend == "mongo":
+            await db[INVALIDATION_COLLECTION].insert_many([dict(m) for m in messages], ordered=True)
+        else:
+            for message in messages:
+                await self._redis.publish(INVALIDATION_CHANNEL, json.dumps(message))
+
+    async def _publish_loop(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self):
+        if not self.outbox or self.backend == "local":
+            return
+        batch = list(self.outbox)
+        self.outbox.clear()
+        try:
+            await self._send(batch)
+        except Exception as e:
+            self.metrics["errors"] += 1
+            logger.warning(f"Could not broadcast {len(batch)} invalidations, retrying: {str(e)}")
+            self.outbox.extendleft(reversed(batch))
+            await asyncio.sleep(1)
+            self._wake.set()
+
+    async def _tail_mongo(self, started: float):
+        collection = db[INVALIDATION_COLLECTION]
+        # Open at the newest message: a tailable cursor with no initial match is dead on arrival
+        newest = await collection.find_one({}, {"published_at": 1}, sort=[("published_at", -1)])
+        since = newest["published_at"] if newest else started
+        while True:
+            try:
+                cursor = collection.find(
+                    {"published_at": {"$gte": since - INVALIDATION_REPLAY_SECONDS}},
+                    {"_id": 0}, cursor_type=CursorType.TAILABLE_AWAIT
+                )
+                while cursor.alive:
+                    async for message in cursor:
+                        since = max(since, message["published_at"])
+                        if message["published_at"] >= started:
+                            self.receive(message)
+            except Exception as e:
+                self.metrics["errors"] += 1
+                logger.warning(f"Invalidation tail interrupted: {str(e)}")
+            await asyncio.sleep(INVALIDATION_POLL_SECONDS)
+
+    async def _listen_redis(self):
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    async for item in pubsub.listen():
+                        if item.get("type") == "message":
+                            self.receive(json.loads(item["data"]))
+            except Exception as e:
+                self.metrics["errors"] += 1
+                logger.warning(f"Invalidation subscription interrupted: {str(e)}")
+            await asyncio.sleep(INVALIDATION_POLL_SECONDS)
+
+    async def start(self):
+        if self._tasks or self.backend == "local":
+            return
+        if self.backend == "redis":
+            if aioredis is None:
+                logger.error("INVALIDATION_BACKEND=redis but the redis package is not installed; invalidations stay local")
+                self.backend = "local"
+                return
+            self._redis = aioredis.from_url(REDIS_URL)
+            listener = self._listen_redis()
+        else:
+            try:
+                await db.create_collection(INVALIDATION_COLLECTION, capped=True, size=INVALIDATION_CAPPED_BYTES)
+            except CollectionInvalid:
+                pass  # already created by another worker
+            await db[INVALIDATION_COLLECTION].create_index("published_at")
+            # Anything published before this worker started predates its caches
+            listener = self._tail_mongo(started=time.time())
+        self._wake = asyncio.Event()
+        if self.outbox:
+            self._wake.set()
+        self._tasks = [asyncio.create_task(self._publish_loop()), asyncio.create_task(listener)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        await self.flush()
+
+    def status(self) -> dict:
+        lags = sorted(self.lag_ms)
+        def percentile(p):
+            return round(lags[min(len(lags) - 1, int(p * len(lags)))], 2) if lags else None
+        return {
+            "backend": self.backend,
+            "worker": self.origin,
+            "pending": len(self.outbox),
+            **self.metrics,
+            "lag_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": round(lags[-1], 2) if lags else None}
+        }
+
+invalidation_bus = InvalidationBus(INVALIDATION_BACKEND)
+
+def evict_catalog(_key):
+    catalog_cache.invalidate()
+    course_detail_cache.invalidate()
+    course_tiers.invalidate()
+
+def reindex_in_background(doc_type):
+    asyncio.get_running_loop().create_task(reindex_search(doc_type))
+
+invalidation_bus.subscribe("catalog", evict_catalog)
+invalidation_bus.subscribe("course_detail", course_detail_cache.invalidate)
+invalidation_bus.subscribe("bundles", bundle_cache.invalidate)
+# The publishing worker has already rebuilt its own index before publishing
+invalidation_bus.subscribe("search", reindex_in_background, remote_only=True)
+invalidation_bus.subscribe("related_courses", refresh_related_in_background, remote_only=True)
+
+@api_router.get("/admin/cache/invalidations")
+async def get_invalidation_status(_: dict = Depends(require_admin)):
+    """Invalidation bus counters and receive lag for this worker"""
+    return invalidation_bus.status()
+
+# ==================== Degraded Mode ====================
+
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_RESET_SECONDS = float(os.environ.get('BREAKER_RESET_SECONDS', '15'))
+SNAPSHOT_DIR = Path(os.environ.get('SNAPSHOT_DIR', str(ROOT_DIR / '.snapshots')))
+SNAPSHOT_REFRESH_SECONDS = 60  # rewrite an unchanged snapshot this often so its Age stays honest
+SNAPSHOT_MAX_ENTRIES = int(os.environ.get('SNAPSHOT_MAX_ENTRIES', '500'))
+# Anonymous public reads that may be answered from the last good response
+SNAPSHOT_ROUTES = re.compile(
+    r"^/api/(courses(/(?!suggest$)[^/]+(/full)?)?|resources|content/[^/]+|podcast/episodes"
+    r"|news/(articles|sources)|membership/tiers|bundle/home|stats/public)$"
+)
+# Query parameters each snapshot route reads; the routes ignore any others, so they are left out of the key
+SNAPSHOT_QUERY_PARAMS = {
+    "/api/courses": ("category", "tier"),
+    "/api/resources": ("resource_type",),
+    "/api/podcast/episodes": ("season",),
+}
+
+def snapshot_key(path: str, query_string: bytes) -> str:
+    allowed = SNAPSHOT_QUERY_PARAMS.get(path, ())
+    params = {name: value for name, value in parse_qsl(query_string.decode("latin-1")) if name in allowed}
+    return path + (f"?{urlencode(sorted(params.items()))}" if params else "")
+
+class CircuitBreaker:
+    """Closed -> open after consecutive database failures -> half-open single probe -> closed"""
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow_request(self) -> bool:
+        if self.state == "closed":
+            return True
+        # Open, or a half-open probe that never reported back: let one caller probe
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = "half_open"  # everyone else keeps getting snapshots meanwhile
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.reset_seconds - (time.monotonic() - self.opened_at)))
+
+    def rearm(self):
+        """A half-open probe that never reached the database proves nothing: let the next request probe"""
+        if self.state == "half_open":
+            self.opened_at = time.monotonic() - self.reset_seconds
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info("Database reachable again, closing circuit breaker")
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.error(f"Opening circuit breaker after {self.failures} database failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+class SnapshotStore:
+    """Last good body of each public GET, stored gzip-compressed on local disk so it survives restarts.
+
+    At most max_entries snapshots are kept, counting ones left by earlier
+    processes; saving past the cap deletes the least recently saved.
+    """
+    def __init__(self, directory: Path, max_entries: int = SNAPSHOT_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.saved = OrderedDict()  # file name -> (body digest, saved at), least recently saved first
+        self.indexed = False
+
+    @staticmethod
+    def _name(key: str) -> str:
+        return f"{hashlib.sha1(key.encode()).hexdigest()}.json.gz"
+
+    def _path(self, key: str) -> Path:
+        return self.directory / self._name(key)
+
+    def _existing(self) -> List[Tuple[str, float]]:
+        try:
+            entries = [(e.name, e.stat().st_mtime) for e in os.scandir(self.directory) if e.name.endswith(".json.gz")]
+        except OSError:
+            return []
+        return sorted(entries, key=lambda entry: entry[1])
+
+    async def save(self, key: str, body: bytes, content_type: str):
+        if not self.indexed:
+            self.indexed = True
+            existing = await asyncio.to_thread(self._existing)
+            self.saved = OrderedDict([(n, (None, at)) for n, at in existing if n not in self.saved] + list(self.saved.items()))
+        name = self._name(key)
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        previous = self.saved.get(name)
+        if previous and previous[0] == digest and time.time() - previous[1] < SNAPSHOT_REFRESH_SECONDS:
+            self.saved.move_to_end(name)
+            return
+        self.saved[name] = (digest, time.time())
+        self.saved.move_to_end(name)
+        evicted = []
+        while len(self.saved) > self.max_entries:
+            evicted.append(self.saved.popitem(last=False)[0])
+        await asyncio.to_thread(self._write, key, body, content_type, evicted)
+
+    def _write(self, key: str, body: bytes, content_type: str, evicted: List[str]):
+        header = json.dumps({"key": key, "content_type": content_type, "saved_at": time.time()}).encode()
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        temporary.write_bytes(gzip.compress(header + b"\n" + body, compresslevel=6, mtime=0))
+        os.replace(temporary, path)
+        for name in evicted:
+            (self.directory / name).unlink(missing_ok=True)
+
+    async def load(self, key: str) -> Optional[tuple]:
+        """(body, content type, saved at) or None"""
+        def read():
+            try:
+                header, _, body = gzip.decompress(self._path(key).read_bytes()).partition(b"\n")
+            except (FileNotFoundError, OSError, EOFError):
+                return None
+            meta = json.loads(header)
+            return body, meta["content_type"], meta["saved_at"]
+        return await asyncio.to_thread(read)
+
+class DegradedModeMiddleware:
+    """Counts database failures into the breaker and, while it is open, answers
+    SNAPSHOT_ROUTES from the snapshot store instead of waiting on MongoDB."""
+    def __init__(self, app, breaker: CircuitBreaker, store: SnapshotStore):
+        self.app = app
+        self.breaker = breaker
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        eligible = (scope["method"] == "GET" and SNAPSHOT_ROUTES.match(scope["path"])
+                    and "authorization" not in Headers(scope=scope))
+        if not eligible:
+            try:
+                return await self.app(scope, receive, send)
+            except PyMongoError:
+                self.breaker.record_failure()
+                raise
+
+        key = snapshot_key(scope["path"], scope["query_string"])
+        if db is None or not self.breaker.allow_request():
+            return await self.serve_snapshot(key, send)
+
+        response = {"status": None, "content_type": "", "body": bytearray(), "complete": False}
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["content_type"] = Headers(raw=message["headers"]).get("content-type", "")
+            elif message["type"] == "http.response.body":
+                response["body"] += message.get("body", b"")
+                response["complete"] = not message.get("more_body", False)
+            await send(message)
+
+        succeeded = []
+        token = request_db_succeeded.set(succeeded)
+        try:
+            await self.app(scope, receive, capture)
+        except PyMongoError as e:
+            self.breaker.record_failure()
+            logger.warning(f"Database error on {scope['path']}, serving snapshot: {str(e)}")
+            if response["status"] is None:
+                return await self.serve_snapshot(key, send)
+            raise
+        finally:
+            request_db_succeeded.reset(token)
+        if response["status"] is not None and response["status"] < 500:
+            # Answers from in-memory caches say nothing about MongoDB either way
+            if succeeded:
+                self.breaker.record_success()
+            else:
+                self.breaker.rearm()
+        if response["status"] == 200 and response["complete"]:
+            try:
+                await self.store.save(key, bytes(response["body"]), response["content_type"])
+            except OSError as e:
+                logger.warning(f"Could not write snapshot for {key}: {str(e)}")
+
+    async def serve_snapshot(self, key: str, send):
+        snapshot = await self.store.load(key)
+        if snapshot is None:
+            body = json.dumps({"detail": "Service temporarily unavailable"}).encode()
+            headers = [(b"content-type", b"application/json"),
+                       (b"retry-after", str(self.breaker.retry_after()).encode())]
+            status_code = 503
+        else:
+            body, content_type, saved_at = snapshot
+            headers = [
+                (b"content-type", content_type.encode()),
+                (b"age", str(max(0, int(time.time() - saved_at))).encode()),
+                (b"warning", b'110 - "Response is Stale"'),
+                (b"x-served-from", b"snapshot"),
+                (b"cache-control", b"no-store"),
+            ]
+            status_code = 200
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+db_breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
+snapshot_store = SnapshotStore(SNAPSHOT_DIR)
+
+# ==================== Response Compression ====================
+
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+COMPRESS_CACHE_ENTRIES = int(os.environ.get('COMPRESS_CACHE_ENTRIES', '256'))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # smaller than gzip -9 at roughly gzip -6 speed
+COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/plain", "text/css", "application/javascript", "application/xml")
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Best encoding the client accepts: br, then gzip; None for identity"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip()] = q
+    for coding in (("br", "gzip") if brotli else ("gzip",)):
+        if accepted.get(coding, accepted.get("*", 0)) > 0:
+            return coding
+    return None
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+class CompressedPayloadCache:
+    """LRU of compressed bodies keyed by (content digest, encoding).
+
+    The digest is the content version: an unchanged payload is compressed once
+    per encoding, and any change to it simply misses and ages out the old entry.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compress(self, body: bytes, encoding: str) -> bytes:
+        key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+        compressed = self.entries.get(key)
+        if compressed is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return compressed
+        self.misses += 1
+        compressed = compress_body(body, encoding)
+        self.entries[key] = compressed
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return compressed
+
+compressed_payloads = CompressedPayloadCache(COMPRESS_CACHE_ENTRIES)
+
+class CompressionMiddleware:
+    """gzip/brotli for complete responses over COMPRESS_MIN_BYTES.
+
+    Streamed responses (SSE, media relay) pass through untouched. Public GETs
+    (no Authorization header) reuse compressed bytes from compressed_payloads.
+    """
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES, cache: Optional[CompressedPayloadCache] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request_headers = Headers(scope=scope)
+        encoding = negotiate_encoding(request_headers.get("accept-encoding", ""))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+        cacheable = self.cache is not None and scope["method"] == "GET" and "authorization" not in request_headers
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                return await send(message)
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            if (message.get("more_body", False) or start_message["status"] != 200 or len(body) < self.minimum_size
+                    or "content-encoding" in headers
+                    or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)):
+                passthrough = True
+                await send(start_message)
+                return await send(message)
+
+            if cacheable:
+                body = self.cache.get_or_compress(body, encoding)
+            else:
+                body = compress_body(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+# ==================== Request Profiling ====================
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_FLAG = b"_profile="
+PROFILE_INTERVAL_SECONDS = float(os.environ.get('PROFILE_INTERVAL_SECONDS', '0.001'))
+PROFILE_COLLECTION = "request_profiles"
+PROFILE_CAPPED_BYTES = int(os.environ.get('PROFILE_CAPPED_BYTES', str(64 * 1024 * 1024)))
+PROFILE_MAX_COMMANDS = 500
+# Frames attributed to a category by file path fragment or (for C extensions) function name prefix
+PROFILE_CATEGORIES = {
+    "pydantic": (("/pydantic/", "/pydantic_core/"), ("SchemaValidator.", "SchemaSerializer.")),
+    "bcrypt": (("/bcrypt/",), ("hashpw", "checkpw", "gensalt")),
+    "mongodb": (("/motor/", "/pymongo/", "/bson/"), ()),
+    "s3": (("/boto3/", "/botocore/", "/s3transfer/"), ()),
+}
+
+def profile_category(frame) -> Optional[str]:
+    path = frame.file_path or ""
+    for category, (paths, functions) in PROFILE_CATEGORIES.items():
+        if any(p in path for p in paths) or (functions and frame.function.startswith(functions)):
+            return category
+    return None
+
+def profile_breakdown(root) -> Dict[str, float]:
+    """Milliseconds per category; a frame's whole subtree counts toward the first category on its stack"""
+    totals = defaultdict(float)
+    stack = [root]
+    while stack:
+        frame = stack.pop()
+        category = profile_category(frame)
+        if category:
+            totals[category] += frame.time
+        elif frame.function == "[await]":
+            totals["await"] += frame.time
+        else:
+            stack.extend(frame.children)
+    breakdown = {f"{name}_ms": round(totals[name] * 1000, 2) for name in (*PROFILE_CATEGORIES, "await")}
+    breakdown["other_ms"] = round(max(0.0, root.time - sum(totals.values())) * 1000, 2)
+    return breakdown
+
+def profile_requested(scope) -> bool:
+    if PROFILE_QUERY_FLAG in scope.get("query_string", b""):
+        return True
+    return any(name == PROFILE_HEADER for name, _ in scope["headers"])
+
+def profile_admin(scope) -> Optional[str]:
+    """Email of the admin making the request, or None when the bearer token is not an admin's"""
+    authorization = Headers(scope=scope).get("authorization", "")
+    if not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        claims = verify_jwt_token(authorization[7:])
+    except HTTPException:
+        return None
+    return claims.get("email") if claims.get("role") == "admin" else None
+
+class ProfilingMiddleware:
+    """Samples a single request's stack when an admin sends X-Profile or ?_profile=1.
+
+    Requests without the flag are passed straight through. The profile, with
+    time broken out for Pydantic, bcrypt, MongoDB and S3, is stored in the
+    capped request_profiles collection and its id returned in X-Profile-Id.
+    One request is profiled at a time per worker; others run unprofiled.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.busy = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profile_requested(scope):
+            return await self.app(scope, receive, send)
+        admin = profile_admin(scope)
+        if admin is None or self.busy or db is None:
+            return await self.app(scope, receive, send)
+        try:
+            profiler = pyinstrument.Profiler(interval=PROFILE_INTERVAL_SECONDS, async_mode="enabled")
+        except ImportError:
+            logger.warning("Request profiling needs pyinstrument, which is not installed")
+            return await self.app(scope, receive, send)
+
+        profile_id = str(uuid.uuid4())
+        status_code = None
+
+        async def send_tagged(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("X-Profile-Id", profile_id)
+            await send(message)
+
+        self.busy = True
+        commands = []
+        token = profiled_commands.set(commands)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_tagged)
+        finally:
+            session = profiler.stop()
+            profiled_commands.reset(token)
+            self.busy = False
+            await self.store(profile_id, scope, status_code, admin, session, commands)
+
+    async def store(self, profile_id, scope, status_code, admin, session, commands):
+        breakdown = profile_breakdown(session.root_frame())
+        breakdown["mongodb_commands_ms"] = round(sum(c["duration_ms"] for c in commands), 2)
+        record = {
+            "id": profile_id,
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": scope.get("query_string", b"").decode("latin-1"),
+            "status": status_code,
+            "duration_ms": round(session.duration * 1000, 2),
+            "breakdown": breakdown,
+            "mongodb_commands": commands,
+            "profiled_by": admin,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "session": session.to_json()
+        }
+        try:
+            await db[PROFILE_COLLECTION].insert_one(record)
+            logger.info(f"Profiled {record['method']} {record['path']} in {record['duration_ms']}ms as {profile_id}")
+        except Exception as e:
+            logger.warning(f"Could not store request profile {profile_id}: {str(e)}")
+
+@api_router.get("/admin/profiles")
+async def list_request_profiles(path: Optional[str] = None, limit: int = Query(50, ge=1, le=200), _: dict = Depends(require_admin)):
+    """Recent request profiles, newest first, without their sample trees"""
+    query = {"path": path} if path else {}
+    return await db[PROFILE_COLLECTION].find(query, {"_id": 0, "session": 0, "mongodb_commands": 0}).sort("created_at", -1).to_list(limit)
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def get_request_profile(profile_id: str, format: str = Query("json", pattern="^(json|html|speedscope)$"), _: dict = Depends(require_admin)):
+    """One stored profile: the record, pyinstrument's interactive flame view (html) or a speedscope file"""
+    record = await db[PROFILE_COLLECTION].find_one({"id": profile_id}, {"_id": 0})
+    if not record:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "json":
+        return record
+    try:
+        session = pyinstrument.session.Session.from_json(record["session"])
+    except ImportError:
+        raise HTTPException(status_code=501, detail="pyinstrument is not installed")
+    if format == "html":
+        return HTMLResponse(pyinstrument.renderers.HTMLRenderer().render(session))
+    return Response(pyinstrument.renderers.SpeedscopeRenderer().render(session), media_type="application/json")
+
+# ==================== Background Jobs ====================
+
+SCHEDULER_TICK_SECONDS = float(os.environ.get('SCHEDULER_TICK_SECONDS', '1'))
+SCHEDULER_LEASE_SECONDS = float(os.environ.get('SCHEDULER_LEASE_SECONDS', '15'))
+SCHEDULER_LEASES = "scheduler_leases"
+SCHEDULER_JOBS = "scheduler_jobs"
+SCHEDULER_LEASE_ID = "scheduler"
+
+class CronSchedule:
+    """Five-field cron expression (minute hour day-of-month month day-of-week) in UTC.
+
+    Fields take *, numbers, a-b ranges, comma lists and /step; Sunday is 0.
+    As in cron, when both day fields are restricted either one may match.
+    """
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression {expression!r} needs 5 fields")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse(part, low, high) for part, (low, high) in zip(parts, self.FIELDS)
+        )
+        self.restricted_days = parts[2] != "*" and parts[4] != "*"
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> set:
+        values = set()
+        for item in field.split(","):
+            spec, _, step = item.partition("/")
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start, end = (int(v) for v in spec.split("-", 1))
+            else:
+                start = int(spec)
+                end = high if step else start
+            if not low <= start <= end <= high:
+                raise ValueError(f"Cron field {field!r} is outside {low}-{high}")
+            values.update(range(start, end + 1, int(step or 1)))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        return (day or weekday) if self.restricted_days else (day and weekday)
+
+    def next_after(self, after: datetime) -> datetime:
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 4)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"Cron expression {self.expression!r} never fires")
+
+class Job:
+    """A periodic coroutine: every `interval` seconds or on a `cron` schedule, plus up to `jitter` seconds.
+
+    leader_only jobs run on exactly one worker of the fleet (the lease
+    holder); the others, like flushing this worker's buffers, run everywhere.
+    """
+    def __init__(self, name: str, func, interval: Optional[float] = None, cron: Optional[str] = None,
+                 jitter: float = 0, timeout: Optional[float] = None, leader_only: bool = True, run_at_start: bool = False):
+        if (interval is None) == (cron is None):
+            raise ValueError(f"Job {name} needs exactly one of interval or cron")
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.cron = CronSchedule(cron) if cron else None
+        self.jitter = jitter
+        self.timeout = timeout
+        self.leader_only = leader_only
+        self.run_at_start = run_at_start
+        self.metrics = {"runs": 0, "failures": 0, "timeouts": 0, "skipped_overlapping": 0,
+                        "last_started_at": None, "last_duration_ms": None, "last_error": None, "total_ms": 0.0}
+
+    def next_run(self, after: datetime) -> datetime:
+        scheduled = after + timedelta(seconds=self.interval) if self.interval is not None else self.cron.next_after(after)
+        return scheduled + timedelta(seconds=random.uniform(0, self.jitter)) if self.jitter else scheduled
+
+    def describe(self) -> str:
+        return f"every {self.interval:g}s" if self.interval is not None else f"cron {self.cron.expression}"
+
+class Scheduler:
+    """In-process async job scheduler with fleet-wide leader election.
+
+    Workers compete for a lease document in scheduler_leases; the holder
+    renews it every third of SCHEDULER_LEASE_SECONDS and, while it holds
+    it, runs the leader_only jobs. Each leader job's next run time lives in
+    scheduler_jobs and a run is claimed with a compare-and-set on it, so even
+    two workers that both think they lead around a lease handover cannot run
+    the same occurrence twice. A job never overlaps itself.
+    """
+    def __init__(self, worker_id: str, lease_seconds: float = SCHEDULER_LEASE_SECONDS, tick_seconds: float = SCHEDULER_TICK_SECONDS):
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.tick_seconds = tick_seconds
+        self.jobs: Dict[str, Job] = {}
+        self.next_runs: Dict[str, datetime] = {}  # local view; authoritative for per-worker jobs only
+        self.running: Dict[str, asyncio.Task] = {}
+        self.lease_until = 0.0  # monotonic deadline; this worker leads while before it
+        self._task = None
+
+    def add(self, job: Job) -> Job:
+        self.jobs[job.name] = job
+        return job
+
+    def job(self, name: str, **options):
+        """Decorator form of add()"""
+        def register(func):
+            self.add(Job(name, func, **options))
+            return func
+        return register
+
+    @property
+    def is_leader(self) -> bool:
+        return time.monotonic() < self.lease_until
+
+    async def renew_lease(self):
+        now = datetime.now(timezone.utc)
+        requested = time.monotonic()
+        try:
+            await db[SCHEDULER_LEASES].update_one(
+                {"_id": SCHEDULER_LEASE_ID, "$or": [{"holder": self.worker_id}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"holder": self.worker_id, "expires_at": now + timedelta(seconds=self.lease_seconds), "renewed_at": now}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Held, unexpired, by another worker: the upsert's insert collided with it
+            if self.lease_until:
+                logger.info(f"Scheduler leadership lost by {self.worker_id}")
+            self.lease_until = 0.0
+            return
+        except PyMongoError as e:
+            logger.warning(f"Scheduler lease renewal failed, leadership lapses with the lease: {str(e)}")
+            return
+        if not self.is_leader:
+            logger.info(f"Scheduler leadership acquired by {self.worker_id}")
+            self.next_runs = {name: when for name, when in self.next_runs.items() if not self.jobs[name].leader_only}
+        # Measured from before the round trip, so a slow write can only shorten the lease we believe we hold
+        self.lease_until = requested + self.lease_seconds
+
+    async def claim(self, job: Job, now: datetime) -> bool:
+        """Atomically move a due leader job's next run forward; True if this worker won the occurrence"""
+        first = now if job.run_at_start else job.next_run(now)
+        state = await db[SCHEDULER_JOBS].find_one_and_update(
+            {"_id": job.name}, {"$setOnInsert": {"next_run_at": first}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        due = state["next_run_at"].replace(tzinfo=timezone.utc)
+        if due > now:
+            self.next_runs[job.name] = due
+            return False
+        following = job.next_run(now)
+        claimed = await db[SCHEDULER_JOBS].find_one_and_update(
+            {"_id": job.name, "next_run_at": state["next_run_at"]},
+            {"$set": {"next_run_at": following, "last_worker": self.worker_id, "last_started_at": now}}
+        )
+        self.next_runs[job.name] = following
+        return claimed is not None
+
+    async def execute(self, job: Job):
+        metrics = job.metrics
+        metrics["last_started_at"] = datetime.now(timezone.utc).isoformat()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(job.func(), timeout=job.timeout)
+            metrics["last_error"] = None
+        except asyncio.TimeoutError:
+            metrics["timeouts"] += 1
+            metrics["last_error"] = f"Timed out after {job.timeout}s"
+            logger.warning(f"Job {job.name} timed out after {job.timeout}s")
+        except Exception as e:
+            metrics["failures"] += 1
+            metrics["last_error"] = str(e)
+            logger.error(f"Job {job.name} failed: {str(e)}")
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            metrics["runs"] += 1
+            metrics["last_duration_ms"] = round(elapsed, 2)
+            metrics["total_ms"] += elapsed
+            self.running.pop(job.name, None)
+
+    async def tick(self):
+        now = datetime.now(timezone.utc)
+        for job in self.jobs.values():
+            if job.leader_only and not self.is_leader:
+                continue
+            due = self.next_runs.get(job.name)
+            if due is None and not job.leader_only:
+                due = self.next_runs[job.name] = now if job.run_at_start else job.next_run(now)
+            if due is not None and due > now:
+                continue
+            if job.name in self.running:
+                job.metrics["skipped_overlapping"] += 1
+                self.next_runs[job.name] = job.next_run(now)
+                continue
+            if job.leader_only:
+                try:
+                    if not await self.claim(job, now):
+                        continue
+                except PyMongoError as e:
+                    logger.warning(f"Could not claim job {job.name}: {str(e)}")
+                    continue
+            else:
+                self.next_runs[job.name] = job.next_run(now)
+            self.running[job.name] = asyncio.create_task(self.execute(job))
+
+    async def _run(self):
+        renew_at = 0.0
+        while True:
+            try:
+                if any(job.leader_only for job in self.jobs.values()) and time.monotonic() >= renew_at:
+                    await self.renew_lease()
+                    renew_at = time.monotonic() + self.lease_seconds / 3
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Scheduler tick failed: {str(e)}")
+            await asyncio.sleep(self.tick_seconds)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        running = list(self.running.values())
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        if self.is_leader:
+            # Hand over now rather than making the next leader wait out the lease
+            try:
+                await db[SCHEDULER_LEASES].delete_one({"_id": SCHEDULER_LEASE_ID, "holder": self.worker_id})
+            except PyMongoError as e:
+                logger.warning(f"Could not release scheduler lease: {str(e)}")
+            self.lease_until = 0.0
+
+    def status(self) -> dict:
+        return {
+            "worker": self.worker_id,
+            "leader": self.is_leader,
+            "jobs": [
+                {
+                    "name": job.name,
+                    "schedule": job.describe(),
+                    "leader_only": job.leader_only,
+                    "running": job.name in self.running,
+                    "next_run_at": self.next_runs[job.name].isoformat() if job.name in self.next_runs else None,
+                    **job.metrics,
+                    "total_ms": round(job.metrics["total_ms"], 2)
+                }
+                for job in self.jobs.values()
+            ]
+        }
+
+scheduler = Scheduler(WORKER_ID)
+
+# Per-worker: each worker buffers and caches in its own memory
+scheduler.add(Job("flush_post_counters", post_counters.flush, interval=COUNTER_FLUSH_SECONDS, timeout=30, leader_only=False))
+scheduler.add(Job("flush_lesson_progress", progress_buffer.flush, interval=PROGRESS_FLUSH_SECONDS, timeout=60, leader_only=False))
+scheduler.add(Job("refresh_public_stats", public_stats.refresh, interval=PUBLIC_STATS_SECONDS, jitter=PUBLIC_STATS_SECONDS / 10,
+                  timeout=30, leader_only=False, run_at_start=True))
+
+@scheduler.job("warm_page_bundles", interval=BUNDLE_FRESH_SECONDS, jitter=BUNDLE_FRESH_SECONDS / 10, timeout=30,
+               leader_only=False, run_at_start=True)
+async def warm_page_bundles():
+    """Keep the public bundles built so no visitor pays for a cold rebuild"""
+    await asyncio.gather(bundle_cache.get("home", build_home_bundle), bundle_cache.get("dashboard", build_dashboard_bundle))
+
+# Fleet-wide: one worker at a time
+if os.environ.get('NEWS_INGEST_ENABLED', 'true').lower() == 'true' and news_ingester.sources:
+    scheduler.add(Job("ingest_news", news_ingester.run_scheduled, interval=NEWS_INGEST_INTERVAL_SECONDS,
+                      jitter=30, timeout=NEWS_INGEST_INTERVAL_SECONDS, run_at_start=True))
+
+@scheduler.job("reconcile_lesson_counts", cron="30 3 * * *", timeout=300)
+async def reconcile_lesson_counts():
+    """Set each course's lesson_count to the number of lessons actually stored for it"""
+    counts = await db.lessons.aggregate([{"$group": {"_id": "$course_id", "count": {"$sum": 1}}}]).to_list(None)
+    operations = [
+        UpdateOne({"id": c["_id"], "lesson_count": {"$ne": c["count"]}}, {"$set": {"lesson_count": c["count"]}})
+        for c in counts
+    ]
+    if not operations:
+        return
+    result = await db.courses.bulk_write(operations, ordered=False)
+    if result.modified_count:
+        logger.info(f"Reconciled lesson_count on {result.modified_count} courses")
+        invalidate_catalog()
+
+@api_router.get("/admin/scheduler")
+async def get_scheduler_status(_: dict = Depends(require_admin)):
+    """This worker's jobs, their metrics and whether it currently holds the scheduler lease"""
+    status = scheduler.status()
+    lease = await db[SCHEDULER_LEASES].find_one({"_id": SCHEDULER_LEASE_ID}, {"_id": 0}) if db is not None else None
+    status["lease"] = {"holder": lease["holder"], "expires_at": lease["expires_at"].isoformat()} if lease else None
+    return status
+
+# ==================== Access Logging ====================
+
+ACCESS_LOGGER = "tkr.access"
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+ACCESS_LOG_SAMPLE_RATE = float(os.environ.get('ACCESS_LOG_SAMPLE_RATE', '1.0'))  # for 2xx/3xx responses
+# Per-route overrides as "route=rate,..."; the heartbeat and health probes are the high-volume routes
+ACCESS_LOG_ROUTE_RATES = {
+    route.strip(): float(rate)
+    for route, rate in (
+        item.split("=") for item in
+        os.environ.get('ACCESS_LOG_ROUTE_RATES', '/api/progress/heartbeat=0.01,/api/health=0').split(",") if item
+    )
+}
+ACCESS_LOG_SLOW_MS = float(os.environ.get('ACCESS_LOG_SLOW_MS', '1000'))  # always logged, like errors
+REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+class AccessLogMiddleware:
+    """One structured record per request on the tkr.access logger.
+
+    Errors (status >= 400) and responses slower than ACCESS_LOG_SLOW_MS are
+    always logged; other responses are sampled at their route's rate, which
+    each record carries so counts can be re-weighted. Every response gets an
+    X-Request-ID, taken from the request when it sends a well-formed one.
+    """
+    def __init__(self, app, sample_rate: float = ACCESS_LOG_SAMPLE_RATE, route_rates: Optional[Dict[str, float]] = None):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.route_rates = ACCESS_LOG_ROUTE_RATES if route_rates is None else route_rates
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        request_id = Headers(scope=scope).get("x-request-id", "")
+        if not REQUEST_ID_RE.match(request_id):
+            request_id = uuid.uuid4().hex
+        status_code = 500  # if the app raises before responding
+        response_bytes = 0
+
+        async def send_with_id(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        ops = []
+        token = request_db_ops.set(ops)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_db_ops.reset(token)
+            latency_ms = (time.perf_counter() - started) * 1000
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            rate = 1.0 if status_code >= 400 or latency_ms >= ACCESS_LOG_SLOW_MS else self.route_rates.get(template, self.sample_rate)
+            if rate >= 1.0 or random.random() < rate:
+                access_logger.info("access", extra={"access": {
+                    "request_id": request_id,
+                    "method": scope["method"],
+                    "route": template,
+                    "path": scope["path"],
+                    "status": status_code,
+                    "latency_ms": round(latency_ms, 2),
+                    "db_ops": len(ops),
+                    "bytes": response_bytes,
+                    "sample_rate": rate,
+                    "worker": WORKER_ID
+                }})
+
+# ==================== Root Route ====================
+
+@api_router.get("/")
+async def root():
+    return {"message": "TKR Coaching API - Transform Your Real Estate Career"}
+
+class DroppingQueueHandler(QueueHandler):
+    """Enqueues records for the listener thread; when the queue is full the record is dropped, never waited on"""
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+class JsonAccessFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps({"ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(), **record.access}, separators=(",", ":"))
+
+# Request handlers only enqueue; a background thread formats and writes
+log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+app_log_handler = logging.StreamHandler()
+app_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+app_log_handler.addFilter(lambda record: record.name != ACCESS_LOGGER)
+access_log_handler = logging.StreamHandler(sys.stdout)
+access_log_handler.setFormatter(JsonAccessFormatter())
+access_log_handler.addFilter(lambda record: record.name == ACCESS_LOGGER)
+log_listener = QueueListener(log_queue, app_log_handler, access_log_handler)
+
+queue_handler = DroppingQueueHandler(log_queue)
+# The queued record carries the bare message; the listener's handlers add the real format
+queue_handler.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+access_logger = logging.getLogger(ACCESS_LOGGER)
+access_logger.propagate = False
+access_logger.addHandler(queue_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
+logger = logging.getLogger(__name__)
+
+async def shutdown_db_client():
+    await scheduler.stop()
+    # Push any buffered counter deltas before the connection goes away
+    await post_counters.flush()
+    await progress_buffer.flush()
+    await change_feed.stop()
+    await contact_writer.stop()
+    await contact_notifier.stop()
+    await invalidation_bus.stop()
+    if media_http is not None:
+        await media_http.aclose()
+    if client:
+        client.close()
+
+@startup_task
+async def startup_check_db():
+    """Check database connection on startup"""
+    if db is None:
+        logger.error("Database not initialized - some features may not work")
+        return
+    
+    try:
         # Test database connection
         await client.admin.command('ping')
         logger.info("Database connection successful")
@@ -772,6 +4243,7 @@ async def fix_placeholder_images():
             for title, url in news:
                 await db.news_articles.update_one({"title": title}, {"$set": {"thumbnail": url}})
             
+            invalidate_catalog()
             logger.info("✅ Placeholder images replaced with real images!")
         else:
             logger.info("No placeholder images found - images are up to date")
@@ -779,7 +4251,7 @@ async def fix_placeholder_images():
     except Exception as e:
         logger.warning(f"Could not check/fix placeholder images: {str(e)}")
 
-@app.on_event("startup")
+@startup_task
 async def startup_seed_data():
     """Seed database with sample data if empty"""
     # Skip seeding in production or if SKIP_SEEDING env var is set
@@ -871,6 +4343,8 @@ async def startup_seed_data():
                 "created_at": datetime.now(timezone.utc).isoformat()
             }
             ]
+            for course in sample_courses:
+                course["tier_rank"] = tier_rank(course["tier"])
             await db.courses.insert_many(sample_courses)
             logger.info("Seeded sample courses")
         
@@ -935,6 +4409,8 @@ async def startup_seed_data():
                 "created_at": datetime.now(timezone.utc).isoformat()
             }
             ]
+            for resource in sample_resources:
+                resource["tier_rank"] = tier_rank(resource["tier_required"])
             await db.resources.insert_many(sample_resources)
             logger.info("Seeded sample resources")
         
@@ -1001,3 +4477,213 @@ async def startup_seed_data():
     except Exception as e:
         logger.error(f"Error during database seeding: {str(e)}")
         logger.warning("Continuing without seeding - database may already be populated or will be migrated")
+
+@startup_task
+async def startup_build_indexes():
+    """Build the in-process search and suggestion indexes once seeding has finished"""
+    if db is None:
+        return
+    try:
+        for doc_type in SEARCH_SOURCES:
+            await reindex_search(doc_type)
+        await rebuild_suggest_index()
+        await rebuild_related_courses()
+        logger.info(f"Search index built with {search_index.n_docs} documents, {len(suggest_index.suggestions)} course suggestions")
+    except Exception as e:
+        logger.error(f"Error building search indexes: {str(e)}")
+
+@startup_task
+async def startup_community_indexes():
+    """Ensure community reply indexes"""
+    if db is None:
+        return
+    try:
+        await db.community_replies.create_index([("post_id", 1), ("created_at", 1)])
+    except Exception as e:
+        logger.warning(f"Could not create community reply index: {str(e)}")
+
+@startup_task
+async def startup_change_feed():
+    """Start this worker's single change stream watcher for live updates"""
+    if db is None:
+        return
+    change_feed.start()
+
+@startup_task
+async def startup_news_indexes():
+    """Ensure the news dedupe and feed state indexes"""
+    if db is None:
+        return
+    try:
+        # Sparse so seeded articles without a url_hash do not collide
+        await db.news_articles.create_index("url_hash", unique=True, sparse=True)
+        await db.news_feed_state.create_index("source", unique=True)
+    except Exception as e:
+        logger.warning(f"Could not create news indexes: {str(e)}")
+
+@startup_task
+async def startup_rate_limit_indexes():
+    """Expire shared rate limit windows automatically"""
+    if db is None or RATE_LIMIT_BACKEND != "mongo":
+        return
+    try:
+        await db.rate_limits.create_index("expires_at", expireAfterSeconds=0)
+    except Exception as e:
+        logger.warning(f"Could not create rate limit index: {str(e)}")
+
+@startup_task
+async def startup_contact_workers():
+    """Start the contact submission writer and email notifier"""
+    if db is None:
+        return
+    try:
+        await db.contact_submissions.create_index([("notification.status", 1), ("notification.next_attempt_at", 1)])
+    except Exception as e:
+        logger.warning(f"Could not create contact notification index: {str(e)}")
+    contact_writer.start()
+    contact_notifier.start()
+
+@startup_task
+async def startup_auth_indexes():
+    """Expire refresh tokens automatically and index them for family/user revocation"""
+    if db is None:
+        return
+    try:
+        await db.refresh_tokens.create_index("expires_at", expireAfterSeconds=0)
+        await db.refresh_tokens.create_index("family_id")
+        await db.refresh_tokens.create_index("user_id")
+    except Exception as e:
+        logger.warning(f"Could not create refresh token indexes: {str(e)}")
+
+@startup_task
+async def startup_catalog_indexes():
+    """Backfill tier_rank on catalog items and create the catalog indexes"""
+    if db is None:
+        return
+    try:
+        for tier, rank in TIER_RANK.items():
+            await db.courses.update_many({"tier": tier, "tier_rank": {"$ne": rank}}, {"$set": {"tier_rank": rank}})
+            await db.resources.update_many({"tier_required": tier, "tier_rank": {"$ne": rank}}, {"$set": {"tier_rank": rank}})
+        await db.resources.update_many({"tier_required": {"$exists": False}}, {"$set": {"tier_rank": 0}})
+        await db.courses.create_index([("tier_rank", 1), ("category", 1), ("title", 1)])
+        await db.resources.create_index([("tier_rank", 1), ("resource_type", 1), ("title", 1)])
+        await db.lessons.create_index([("course_id", 1), ("order", 1)])
+        # Upsert keys for the catalog import
+        for collection in ("courses", "resources", "lessons"):
+            await db[collection].create_index("id")
+        await db.courses.create_index("title")
+        await db.resources.create_index("title")
+    except Exception as e:
+        logger.warning(f"Could not prepare catalog tier indexes: {str(e)}")
+    invalidate_catalog()
+
+@startup_task
+async def startup_request_profiles():
+    """Create the capped collection that keeps the most recent request profiles"""
+    if db is None:
+        return
+    try:
+        await db.create_collection(PROFILE_COLLECTION, capped=True, size=PROFILE_CAPPED_BYTES)
+    except CollectionInvalid:
+        pass  # already created by another worker
+    except Exception as e:
+        logger.warning(f"Could not create request profile collection: {str(e)}")
+        return
+    await db[PROFILE_COLLECTION].create_index("id")
+
+@startup_task
+async def startup_progress_indexes():
+    """Index progress by user"""
+    if db is None:
+        return
+    try:
+        await db.course_progress.create_index([("user_id", 1), ("updated_at", -1)])
+    except Exception as e:
+        logger.warning(f"Could not create progress index: {str(e)}")
+
+@startup_task
+async def startup_invalidation_bus():
+    if db is None:
+        return
+    try:
+        await invalidation_bus.start()
+    except Exception as e:
+        logger.warning(f"Could not start cache invalidation bus, caches stay worker-local: {str(e)}")
+
+@startup_task
+async def startup_scheduler():
+    """Index the scheduler collections and start running background jobs"""
+    if db is None:
+        return
+    try:
+        await db[SCHEDULER_LEASES].create_index("expires_at", expireAfterSeconds=0)
+    except Exception as e:
+        logger.warning(f"Could not create scheduler lease index: {str(e)}")
+    scheduler.start()
+
+# ==================== App Factory ====================
+
+async def run_warmup():
+    """Run the registered startup tasks in order, timing each one into startup_profile"""
+    warmup = startup_profile["warmup"]
+    warmup["status"] = "running"
+    started = time.perf_counter()
+    for task in STARTUP_TASKS:
+        entry = {"name": task.__name__, "started_ms": round((time.perf_counter() - started) * 1000, 1)}
+        warmup["tasks"].append(entry)
+        task_started = time.perf_counter()
+        try:
+            await task()
+            entry["status"] = "ok"
+        except Exception as e:
+            entry["status"] = "failed"
+            logger.error(f"Startup task {task.__name__} failed: {str(e)}")
+        entry["duration_ms"] = round((time.perf_counter() - task_started) * 1000, 1)
+    warmup["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    warmup["status"] = "done"
+    logger.info(f"Warmup finished in {warmup['total_ms']}ms")
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    started = time.perf_counter()
+    # Serve immediately; seeding, index builds and worker starts continue in the background
+    warmup = asyncio.create_task(run_warmup())
+    startup_profile["lifespan"]["startup_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    startup_profile["lifespan"]["ready_since_import_ms"] = round((time.perf_counter() - MODULE_IMPORT_STARTED) * 1000, 1)
+    yield
+    started = time.perf_counter()
+    warmup.cancel()
+    await shutdown_db_client()
+    startup_profile["lifespan"]["shutdown_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+@api_router.get("/health")
+async def health():
+    """Readiness: true as soon as the app serves; warmup progress is informational"""
+    return {"status": "ok", "warmup": startup_profile["warmup"]["status"]}
+
+@api_router.get("/admin/diagnostics/startup")
+async def get_startup_profile(_: dict = Depends(require_admin)):
+    """Import time, deferred imports/clients and lifespan/warmup phase timings for this worker"""
+    return startup_profile
+
+def create_app() -> FastAPI:
+    application = FastAPI(lifespan=lifespan)
+    application.include_router(api_router)
+    # Innermost, so a profile covers the route itself rather than compression or CORS
+    application.add_middleware(ProfilingMiddleware)
+    # Inside CORS, so snapshots and the degraded 503 stay readable by the cross-origin frontend
+    application.add_middleware(DegradedModeMiddleware, breaker=db_breaker, store=snapshot_store)
+    application.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    application.add_middleware(CompressionMiddleware, cache=compressed_payloads)
+    # Outermost, so latency and bytes are what the client sees
+    application.add_middleware(AccessLogMiddleware)
+    return application
+
+app = create_app()
+startup_profile["import_ms"] = round((time.perf_counter() - MODULE_IMPORT_STARTED) * 1000, 1)
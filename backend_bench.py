@@ -0,0 +1,176 @@
+"""TKR Coaching API benchmarks.
+
+Both suites run against throwaway databases (same setup as backend_test.py;
+requires MONGO_URL, read from backend/.env if present).
+
+compression
+    Drives the API routes in-process and reports, per endpoint and
+    Accept-Encoding, the bytes on the wire and the CPU time per request for
+    three configurations:
+
+        off        no compression middleware
+        per-req    CompressionMiddleware compressing every response
+        cached     CompressionMiddleware with the precompressed payload cache
+
+    --scale multiplies the seeded courses and community posts so list
+    payloads are closer to production size.
+
+startup
+    Boots the app in fresh interpreters and reports the median of each
+    startup_profile phase: module import, time until the lifespan is
+    serving, deferred imports/clients and every warmup task.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).parent / "backend"
+
+ENDPOINTS = ["courses", "podcast/episodes", "community/posts", "admin/content/all"]
+ENCODINGS = ["identity", "gzip", "br"]
+
+
+def load_server():
+    sys.path.insert(0, str(BACKEND_DIR))
+    import server
+    if server.client is None:
+        raise RuntimeError("MongoDB client could not be created - check MONGO_URL")
+    return server
+
+
+async def seed(server, scale):
+    """Seed the sample data, then clone courses and posts up to `scale` copies"""
+    await server.startup_seed_data()
+    for collection in ("courses", "community_posts"):
+        originals = await server.db[collection].find({}, {"_id": 0}).to_list(1000)
+        copies = [
+            {**doc, "id": str(uuid.uuid4()), "title": f"{doc.get('title', '')} ({n})"}
+            for n in range(1, scale) for doc in originals
+        ]
+        if copies:
+            await server.db[collection].insert_many(copies)
+
+
+async def measure(app, endpoint, encoding, requests):
+    """(wire bytes per response, CPU ms per request) for one endpoint/encoding"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench/api/") as client:
+        headers = {"Accept-Encoding": encoding}
+        wire_bytes = 0
+        started = time.process_time()
+        for _ in range(requests):
+            # Raw bytes: the client never decompresses, so only server work is timed
+            async with client.stream("GET", endpoint, headers=headers) as response:
+                async for chunk in response.aiter_raw():
+                    wire_bytes += len(chunk)
+        cpu = time.process_time() - started
+    return wire_bytes / requests, cpu * 1000 / requests
+
+
+STARTUP_PROBE = """
+import asyncio, json, os, time, uuid
+started = time.perf_counter()
+import server
+
+async def boot():
+    database_name = f"{os.environ['DB_NAME']}_bench_startup_{uuid.uuid4().hex[:8]}"
+    server.db = server.client[database_name]
+    try:
+        async with server.app.router.lifespan_context(server.app):
+            ready = time.perf_counter()
+            while server.startup_profile["warmup"]["status"] != "done":
+                await asyncio.sleep(0.01)
+            profile = dict(server.startup_profile, process_ready_ms=round((ready - started) * 1000, 1))
+    finally:
+        await server.client.drop_database(database_name)
+    print(json.dumps(profile))
+
+asyncio.run(boot())
+"""
+
+
+def run_startup(runs):
+    """Median startup phases over `runs` fresh interpreters, each with its own database"""
+    profiles = []
+    for _ in range(runs):
+        env = dict(os.environ, NEWS_INGEST_ENABLED="false")
+        result = subprocess.run([sys.executable, "-c", STARTUP_PROBE], cwd=BACKEND_DIR, env=env,
+                                capture_output=True, text=True, timeout=120)
+        if result.returncode != 0:
+            print(result.stderr[-2000:])
+            return 1
+        profiles.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    def median(values):
+        return statistics.median(values) if values else float("nan")
+
+    print(f"Startup profile, median of {runs} runs (ms)\n")
+    rows = [
+        ("module import", median([p["import_ms"] for p in profiles])),
+        ("lifespan startup", median([p["lifespan"]["startup_ms"] for p in profiles])),
+        ("ready since import start", median([p["lifespan"]["ready_since_import_ms"] for p in profiles])),
+        ("ready since interpreter start", median([p["process_ready_ms"] for p in profiles])),
+        ("warmup total (background)", median([p["warmup"]["total_ms"] for p in profiles])),
+    ]
+    for name in sorted({n for p in profiles for n in p["deferred"]}):
+        rows.append((f"deferred: {name}", median([p["deferred"][name] for p in profiles if name in p["deferred"]])))
+    for index, task in enumerate(profiles[0]["warmup"]["tasks"]):
+        rows.append((f"warmup: {task['name']}", median([p["warmup"]["tasks"][index]["duration_ms"] for p in profiles])))
+    for name, value in rows:
+        print(f"{name:<40} {value:>10.1f}")
+    return 0
+
+
+async def run(requests, scale):
+    server = load_server()
+    database_name = f"{os.environ['DB_NAME']}_bench_{uuid.uuid4().hex[:8]}"
+    server.db = server.client[database_name]
+    try:
+        await seed(server, scale)
+        router = server.app.router
+        configs = {
+            "off": router,
+            "per-req": server.CompressionMiddleware(router, cache=None),
+            "cached": server.CompressionMiddleware(router, cache=server.CompressedPayloadCache(256)),
+        }
+        encodings = ENCODINGS if server.brotli else [e for e in ENCODINGS if e != "br"]
+
+        print(f"{requests} requests per row, catalog scale x{scale}\n")
+        print(f"{'endpoint':<20} {'encoding':<9} {'mode':<8} {'bytes/resp':>11} {'ratio':>6} {'cpu ms/req':>11}")
+        print("-" * 70)
+        for endpoint in ENDPOINTS:
+            baseline_bytes, baseline_cpu = await measure(configs["off"], endpoint, "identity", requests)
+            print(f"{endpoint:<20} {'identity':<9} {'off':<8} {baseline_bytes:>11.0f} {1:>6.2f} {baseline_cpu:>11.3f}")
+            for encoding in encodings[1:]:
+                for mode in ("per-req", "cached"):
+                    wire, cpu = await measure(configs[mode], endpoint, encoding, requests)
+                    print(f"{endpoint:<20} {encoding:<9} {mode:<8} {wire:>11.0f} "
+                          f"{baseline_bytes / wire if wire else 0:>6.2f} {cpu:>11.3f}")
+        return 0
+    finally:
+        await server.client.drop_database(database_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TKR Coaching API benchmarks")
+    parser.add_argument("suite", nargs="?", choices=["compression", "startup"], default="compression")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint/encoding/mode (default 200)")
+    parser.add_argument("--scale", type=int, default=20, help="Copies of the seeded courses and posts (default 20)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters for the startup suite (default 5)")
+    args = parser.parse_args()
+    if args.suite == "startup":
+        return run_startup(args.runs)
+    return asyncio.run(run(args.requests, args.scale))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
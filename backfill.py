@@ -0,0 +1,254 @@
+"""Resumable, concurrent MongoDB backfills.
+
+A backfill scans one collection in _id order, a batch at a time, turns each
+document into an update (from a declarative mapping or a transform function)
+and applies the batch with an unordered bulk_write. Up to --concurrency
+batches are written at once and --rate caps documents scanned per second.
+
+After every batch the highest contiguous finished _id is checkpointed to the
+backfill_checkpoints collection, so an interrupted run resumes where it
+stopped; --restart ignores the checkpoint. --dry-run reports what would
+change without writing anything, checkpoints included.
+
+Backfills come from a JSON file of mapping specs:
+
+    [{"name": "course-thumbnails", "collection": "courses", "key": "title",
+      "set": {"Negotiation Masterclass": {"thumbnail": "https://..."}}}]
+
+or from a Python attribute holding a list of Backfill objects:
+
+    python backfill.py update_production_images:BACKFILLS --dry-run
+
+MONGO_URL and DB_NAME are read from the environment; backend/.env fills them
+in only when MONGO_URL is unset and no --db is given.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import sys
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+CHECKPOINTS = "backfill_checkpoints"
+
+
+class Backfill:
+    """One collection's backfill: which documents to scan and how to update each.
+
+    `transform(doc)` returns a pymongo update document, or None to leave the
+    document alone. Use Backfill.mapping for the common "set these fields on
+    the document whose <key> is X" case.
+    """
+
+    def __init__(self, name: str, collection: str, transform: Callable[[dict], Optional[dict]],
+                 query: Optional[dict] = None, projection: Optional[dict] = None):
+        self.name = name
+        self.collection = collection
+        self.transform = transform
+        self.query = query or {}
+        self.projection = projection
+        self.keys = None  # mapping keys, to report the ones no document matched
+
+    @classmethod
+    def mapping(cls, name: str, collection: str, key: str, values: Dict[str, dict]) -> "Backfill":
+        """$set values[doc[key]] on every document whose key is mapped, skipping ones already up to date"""
+        def transform(doc):
+            fields = values.get(doc.get(key))
+            if not fields or all(doc.get(f) == v for f, v in fields.items()):
+                return None
+            return {"$set": fields}
+
+        fields = {f for update in values.values() for f in update}
+        backfill = cls(name, collection, transform, query={key: {"$in": list(values)}},
+                       projection={key: 1, **{f: 1 for f in fields}})
+        backfill.keys = (key, set(values))
+        return backfill
+
+    @classmethod
+    def from_spec(cls, spec: dict) -> "Backfill":
+        return cls.mapping(spec["name"], spec["collection"], spec["key"], spec["set"])
+
+
+class BackfillRunner:
+    """Runs one Backfill against a database with bounded concurrency and checkpoints"""
+
+    def __init__(self, database, backfill: Backfill, batch_size: int = 500, concurrency: int = 4,
+                 rate: Optional[float] = None, dry_run: bool = False, restart: bool = False, log=print):
+        self.db = database
+        self.backfill = backfill
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.rate = rate
+        self.dry_run = dry_run
+        self.restart = restart
+        self.log = log
+        self.checkpoint_key = f"{backfill.name}:{backfill.collection}"
+        self.stats = {"scanned": 0, "matched": 0, "modified": 0, "batches": 0}
+        self.seen_keys = set()
+
+    async def load_checkpoint(self) -> Optional[dict]:
+        if self.restart:
+            return None
+        return await self.db[CHECKPOINTS].find_one({"_id": self.checkpoint_key})
+
+    async def save_checkpoint(self, last_id, done: bool = False):
+        if self.dry_run:
+            return
+        await self.db[CHECKPOINTS].update_one(
+            {"_id": self.checkpoint_key},
+            {"$set": {"last_id": last_id, "done": done, "updated_at": datetime.now(timezone.utc).isoformat(), **self.stats}},
+            upsert=True
+        )
+
+    async def apply(self, docs: List[dict]) -> dict:
+        """Write one batch and return its counts; they join self.stats once the checkpoint passes the batch"""
+        operations = []
+        for doc in docs:
+            if self.backfill.keys:
+                self.seen_keys.add(doc.get(self.backfill.keys[0]))
+            update = self.backfill.transform(doc)
+            if update:
+                operations.append(UpdateOne({"_id": doc["_id"]}, update))
+        counts = {"scanned": len(docs), "matched": len(operations), "modified": 0, "batches": 1}
+        if operations and not self.dry_run:
+            result = await self.db[self.backfill.collection].bulk_write(operations, ordered=False)
+            counts["modified"] = result.modified_count
+        return counts
+
+    async def run(self) -> dict:
+        checkpoint = await self.load_checkpoint()
+        if checkpoint and checkpoint.get("done"):
+            self.log(f"{self.checkpoint_key}: already complete, use --restart to run again")
+            return {**self.stats, "resumed": True, "done": True}
+        last_id = checkpoint["last_id"] if checkpoint else None
+        if checkpoint:
+            if not self.dry_run:  # a dry run reports only what it would still change
+                self.stats.update({k: checkpoint.get(k, 0) for k in self.stats})
+            self.log(f"{self.checkpoint_key}: resuming after _id {last_id}")
+
+        collection = self.db[self.backfill.collection]
+        in_flight = deque()  # (last _id of batch, task), in scan order
+        started = time.monotonic()
+        scanned_this_run = 0
+        dispatched = 0
+
+        async def settle(block: bool):
+            # Advance the checkpoint only past batches whose predecessors all finished, counting them
+            # only then, so the saved stats cover exactly the documents up to the saved _id
+            nonlocal committed_id
+            while in_flight and (block or in_flight[0][1].done()):
+                batch_last_id, task = in_flight.popleft()
+                for field, count in (await task).items():
+                    self.stats[field] += count
+                committed_id = batch_last_id
+                await self.save_checkpoint(committed_id)
+                block = False
+
+        committed_id = last_id
+        try:
+            while True:
+                query = dict(self.backfill.query)
+                if last_id is not None:
+                    query = {"$and": [query, {"_id": {"$gt": last_id}}]}
+                docs = await collection.find(query, self.backfill.projection).sort("_id", 1).limit(self.batch_size).to_list(self.batch_size)
+                if not docs:
+                    break
+                last_id = docs[-1]["_id"]
+                scanned_this_run += len(docs)
+
+                while len(in_flight) >= self.concurrency:
+                    await settle(block=True)
+                in_flight.append((last_id, asyncio.create_task(self.apply(docs))))
+                dispatched += 1
+                await settle(block=False)
+
+                if dispatched % 10 == 0:
+                    self.log(f"{self.checkpoint_key}: {self.stats['scanned']} scanned, {self.stats['matched']} to update, "
+                             f"{self.stats['modified']} modified")
+                if self.rate:
+                    # Pace scanning to the requested documents per second
+                    ahead = scanned_this_run / self.rate - (time.monotonic() - started)
+                    if ahead > 0:
+                        await asyncio.sleep(ahead)
+            while in_flight:
+                await settle(block=True)
+        except BaseException:
+            for _, task in in_flight:
+                task.cancel()
+            raise
+        await self.save_checkpoint(committed_id, done=True)
+
+        result = {**self.stats, "resumed": checkpoint is not None, "done": True}
+        if self.backfill.keys and checkpoint is None:
+            result["unmatched"] = sorted(self.backfill.keys[1] - self.seen_keys)
+        return result
+
+
+def load_backfills(target: str) -> List[Backfill]:
+    """Backfills from a JSON spec file or a module:attribute reference"""
+    if target.endswith(".json"):
+        specs = json.loads(Path(target).read_text())
+        return [Backfill.from_spec(spec) for spec in (specs if isinstance(specs, list) else [specs])]
+    module_name, _, attribute = target.partition(":")
+    sys.path.insert(0, os.getcwd())
+    backfills = getattr(importlib.import_module(module_name), attribute or "BACKFILLS")
+    return list(backfills)
+
+
+async def run_backfills(database, backfills: List[Backfill], **options):
+    for backfill in backfills:
+        result = await BackfillRunner(database, backfill, **options).run()
+        verb = "would update" if options.get("dry_run") else "modified"
+        count = result["matched"] if options.get("dry_run") else result["modified"]
+        print(f"✅ {backfill.name}: {result['scanned']} scanned, {count} {verb}")
+        for key in result.get("unmatched", []):
+            print(f"⚠️  {backfill.name}: no document with {backfill.keys[0]}={key!r}")
+
+
+def main(argv=None, load_env: bool = True):
+    parser = argparse.ArgumentParser(description="Resumable, concurrent MongoDB backfills")
+    parser.add_argument("target", help="JSON spec file, or module:attribute holding a list of Backfill")
+    parser.add_argument("--db", default=None, help="Database name (default: $DB_NAME)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=4, help="Batches written at once (default 4)")
+    parser.add_argument("--rate", type=float, default=None, help="Max documents scanned per second")
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing")
+    parser.add_argument("--restart", action="store_true", help="Ignore saved checkpoints")
+    args = parser.parse_args(argv)
+
+    if load_env and not args.db and not os.environ.get("MONGO_URL"):
+        load_dotenv(Path(__file__).parent / "backend" / ".env")
+    mongo_url = os.environ.get("MONGO_URL")
+    if not mongo_url and not load_env:
+        print("ERROR: MONGO_URL not found. This should be run in production environment.")
+        return 1
+    database_name = args.db or os.environ.get("DB_NAME")
+    if not mongo_url or not database_name:
+        print("ERROR: MONGO_URL and DB_NAME (or --db) are required")
+        return 1
+
+    client = AsyncIOMotorClient(mongo_url)
+    try:
+        asyncio.run(run_backfills(
+            client[database_name], load_backfills(args.target), batch_size=args.batch_size,
+            concurrency=args.concurrency, rate=args.rate, dry_run=args.dry_run, restart=args.restart
+        ))
+    except Exception as e:
+        print(f"\n❌ ERROR: {str(e)} - rerun to resume from the last checkpoint")
+        return 1
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,8 @@ import { Outlet, Link, useNavigate } from 'react-router-dom';
 import { Menu, X, Edit } from 'lucide-react';
 import { Button } from '@/components/ui/button';
 import { useEditMode } from '@/contexts/EditModeContext';
+import { clearSession } from '@/lib/auth';
+import axios from 'axios';
 
 const Layout = () => {
   const [isMenuOpen, setIsMenuOpen] = useState(false);
@@ -22,17 +24,16 @@ const Layout = () => {
   useEffect(() => {
     const token = localStorage.getItem('tkr_token');
     if (token) {
-      fetch(`${process.env.REACT_APP_BACKEND_URL}/api/auth/me`, {
+      axios.get(`${process.env.REACT_APP_BACKEND_URL}/api/auth/me`, {
         headers: { 'Authorization': `Bearer ${token}` }
       })
-        .then(res => res.json())
-        .then(data => setUser(data))
-        .catch(() => localStorage.removeItem('tkr_token'));
+        .then(res => setUser(res.data))
+        .catch(() => clearSession());
     }
   }, []);
 
   const handleLogout = () => {
-    localStorage.removeItem('tkr_token');
+    clearSession();
     setUser(null);
     navigate('/');
   };
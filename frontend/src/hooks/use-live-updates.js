@@ -0,0 +1,48 @@
+import { useEffect, useRef } from 'react';
+
+const API_URL = process.env.REACT_APP_BACKEND_URL + '/api';
+
+// Subscribes to the server-sent events stream for the given collections.
+// EventSource reconnects by itself and sends Last-Event-ID, so the server
+// resumes exactly where the previous connection stopped; "reset" means it
+// could not, and the caller should refetch.
+export function useLiveUpdates(topics, onEvent, onReset) {
+  const handlers = useRef({ onEvent, onReset });
+  handlers.current = { onEvent, onReset };
+  const topicList = topics.join(',');
+
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') {
+      return undefined;
+    }
+
+    const source = new EventSource(`${API_URL}/events/stream?topics=${topicList}`);
+    const handleChange = (message) => {
+      try {
+        handlers.current.onEvent?.(JSON.parse(message.data));
+      } catch (err) {
+        console.error('Error handling live update:', err);
+      }
+    };
+    const handleReset = () => handlers.current.onReset?.();
+
+    topicList.split(',').forEach((topic) => source.addEventListener(topic, handleChange));
+    source.addEventListener('reset', handleReset);
+
+    return () => source.close();
+  }, [topicList]);
+}
+
+// Applies a community_posts change event to a newest-first list of posts.
+export function applyPostEvent(posts, event) {
+  if (event.operation === 'delete') {
+    return posts.filter((post) => post.id !== event.id);
+  }
+  if (!event.document) {
+    return posts;
+  }
+  if (posts.some((post) => post.id === event.id)) {
+    return posts.map((post) => (post.id === event.id ? { ...post, ...event.document } : post));
+  }
+  return [event.document, ...posts];
+}
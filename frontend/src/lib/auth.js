@@ -0,0 +1,66 @@
+import axios from 'axios';
+
+const API_URL = process.env.REACT_APP_BACKEND_URL + '/api';
+const ACCESS_TOKEN_KEY = 'tkr_token';
+const REFRESH_TOKEN_KEY = 'tkr_refresh_token';
+
+export function saveSession(data) {
+  localStorage.setItem(ACCESS_TOKEN_KEY, data.token);
+  localStorage.setItem(REFRESH_TOKEN_KEY, data.refresh_token);
+}
+
+export function clearSession() {
+  const refreshToken = localStorage.getItem(REFRESH_TOKEN_KEY);
+  localStorage.removeItem(ACCESS_TOKEN_KEY);
+  localStorage.removeItem(REFRESH_TOKEN_KEY);
+  if (refreshToken) {
+    axios.post(`${API_URL}/auth/logout`, { refresh_token: refreshToken }).catch(() => {});
+  }
+}
+
+// Access tokens are short-lived. One refresh is shared by every request that
+// hit a 401 at the same time, since each refresh token can only be used once.
+let refreshing = null;
+
+function refreshSession() {
+  if (!refreshing) {
+    const refreshToken = localStorage.getItem(REFRESH_TOKEN_KEY);
+    refreshing = (refreshToken
+      ? axios.post(`${API_URL}/auth/refresh`, { refresh_token: refreshToken })
+      : Promise.reject(new Error('No refresh token'))
+    )
+      .then(res => {
+        saveSession(res.data);
+        return res.data.token;
+      })
+      .catch(err => {
+        localStorage.removeItem(ACCESS_TOKEN_KEY);
+        localStorage.removeItem(REFRESH_TOKEN_KEY);
+        throw err;
+      })
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+}
+
+axios.interceptors.response.use(undefined, async (error) => {
+  const request = error.config;
+  const authorization = request?.headers?.Authorization;
+  if (
+    error.response?.status !== 401 ||
+    !authorization?.startsWith('Bearer ') ||
+    request._retried ||
+    request.url?.endsWith('/auth/refresh')
+  ) {
+    throw error;
+  }
+
+  const token = await refreshSession().catch(() => {
+    throw error;
+  });
+  request._retried = true;
+  request.headers.Authorization = `Bearer ${token}`;
+  return axios(request);
+});
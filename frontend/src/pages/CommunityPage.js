@@ -4,6 +4,7 @@ import { Users, MessageCircle, Heart, TrendingUp } from 'lucide-react';
 import { Button } from '@/components/ui/button';
 import { Card, CardContent } from '@/components/ui/card';
 import axios from 'axios';
+import { useLiveUpdates, applyPostEvent } from '@/hooks/use-live-updates';
 
 const API_URL = process.env.REACT_APP_BACKEND_URL + '/api';
 
@@ -11,7 +12,7 @@ const CommunityPage = () => {
   const [posts, setPosts] = useState([]);
   const [loading, setLoading] = useState(true);
 
-  useEffect(() => {
+  const fetchPosts = () => {
     axios.get(`${API_URL}/community/posts`)
       .then(res => {
         setPosts(res.data);
@@ -21,8 +22,18 @@ const CommunityPage = () => {
         console.error('Error fetching posts:', err);
         setLoading(false);
       });
+  };
+
+  useEffect(() => {
+    fetchPosts();
   }, []);
 
+  useLiveUpdates(
+    ['community_posts'],
+    (event) => setPosts(current => applyPostEvent(current, event)),
+    fetchPosts
+  );
+
   return (
     <div className="min-h-screen bg-gray-50">
       {/* Header */}
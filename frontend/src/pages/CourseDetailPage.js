@@ -14,6 +14,7 @@ const CourseDetailPage = () => {
   const navigate = useNavigate();
   const [course, setCourse] = useState(null);
   const [lessons, setLessons] = useState([]);
+  const [related, setRelated] = useState([]);
   const [user, setUser] = useState(null);
   const [loading, setLoading] = useState(true);
 
@@ -27,13 +28,10 @@ const CourseDetailPage = () => {
         .catch(() => {});
     }
 
-    axios.get(`${API_URL}/courses/${courseId}`)
+    axios.get(`${API_URL}/courses/${courseId}/full`)
       .then(res => {
-        setCourse(res.data);
-        return axios.get(`${API_URL}/courses/${courseId}/lessons`);
-      })
-      .then(res => {
-        setLessons(res.data);
+        setCourse(res.data.course);
+        setLessons(res.data.lessons);
         setLoading(false);
       })
       .catch(err => {
@@ -41,6 +39,10 @@ const CourseDetailPage = () => {
         toast.error('Course not found');
         setLoading(false);
       });
+
+    axios.get(`${API_URL}/courses/${courseId}/related`)
+      .then(res => setRelated(res.data))
+      .catch(() => setRelated([]));
   }, [courseId]);
 
   const canAccessCourse = () => {
@@ -61,6 +63,21 @@ const CourseDetailPage = () => {
     toast.success('Enrolled successfully!');
   };
 
+  const handleWatchLesson = (lesson) => {
+    const token = localStorage.getItem('tkr_token');
+    axios.get(`${API_URL}/media/lessons/${lesson.id}`, {
+      headers: { 'Authorization': `Bearer ${token}` }
+    })
+      .then(res => window.open(res.data.url, '_blank', 'noopener'))
+      .catch(err => {
+        if (err.response?.status === 403) {
+          navigate('/pricing');
+          return;
+        }
+        toast.error('This lesson is not available right now');
+      });
+  };
+
   if (loading) {
     return (
       <div className="min-h-screen flex items-center justify-center">
@@ -224,7 +241,7 @@ const CourseDetailPage = () => {
                   <AccordionContent className="pl-12 pt-4">
                     <p className="text-gray-600">{lesson.description}</p>
                     {lesson.video_url && user && canAccessCourse() && (
-                      <Button className="mt-4" variant="outline">
+                      <Button className="mt-4" variant="outline" onClick={() => handleWatchLesson(lesson)}>
                         <Play size={16} className="mr-2" />
                         Watch Lesson
                       </Button>
@@ -237,6 +254,39 @@ const CourseDetailPage = () => {
         </div>
       </section>
 
+      {/* Related Courses */}
+      {related.length > 0 && (
+        <section className="py-12 bg-white" data-testid="related-courses">
+          <div className="container mx-auto px-4 sm:px-6 lg:px-8">
+            <h2 className="text-3xl font-bold text-gray-900 mb-8">Related Courses</h2>
+            <div className="grid md:grid-cols-2 lg:grid-cols-3 gap-6">
+              {related.map((item) => (
+                <Link key={item.id} to={`/courses/${item.id}`} data-testid={`related-course-${item.id}`}>
+                  <Card className="overflow-hidden hover:shadow-xl transition-shadow duration-300 group h-full">
+                    <div className="overflow-hidden bg-gray-200">
+                      <img
+                        src={item.thumbnail}
+                        alt={item.title}
+                        className="w-full h-40 object-cover group-hover:scale-105 transition-transform duration-300"
+                        loading="lazy"
+                      />
+                    </div>
+                    <CardContent className="p-5 space-y-2">
+                      <span className="text-xs font-semibold uppercase tkr-burgundy">{item.category}</span>
+                      <h3 className="text-lg font-bold text-gray-900">{item.title}</h3>
+                      <div className="flex items-center gap-4 text-sm text-gray-500">
+                        <span className="flex items-center"><Clock size={14} className="mr-1" />{item.duration}</span>
+                        <span className="flex items-center"><BookOpen size={14} className="mr-1" />{item.lesson_count} lessons</span>
+                      </div>
+                    </CardContent>
+                  </Card>
+                </Link>
+              ))}
+            </div>
+          </div>
+        </section>
+      )}
+
       {/* Related Courses CTA */}
       <section className="py-12 bg-cream-light">
         <div className="container mx-auto px-4 sm:px-6 lg:px-8 text-center">
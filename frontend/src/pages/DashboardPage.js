@@ -5,6 +5,8 @@ import { Button } from '@/components/ui/button';
 import { Card, CardContent } from '@/components/ui/card';
 import { Progress } from '@/components/ui/progress';
 import axios from 'axios';
+import { useLiveUpdates, applyPostEvent } from '@/hooks/use-live-updates';
+import { clearSession } from '@/lib/auth';
 
 const API_URL = process.env.REACT_APP_BACKEND_URL + '/api';
 
@@ -15,6 +17,7 @@ const DashboardPage = () => {
   const [courses, setCourses] = useState([]);
   const [podcasts, setPodcasts] = useState([]);
   const [communityPosts, setCommunityPosts] = useState([]);
+  const [progress, setProgress] = useState({});
 
   useEffect(() => {
     const token = localStorage.getItem('tkr_token');
@@ -23,33 +26,31 @@ const DashboardPage = () => {
       return;
     }
 
-    axios.get(`${API_URL}/auth/me`, {
+    axios.get(`${API_URL}/bundle/dashboard`, {
       headers: { 'Authorization': `Bearer ${token}` }
     })
       .then(res => {
-        setUser(res.data);
-        return Promise.all([
-          axios.get(`${API_URL}/courses`),
-          axios.get(`${API_URL}/podcast/episodes`),
-          axios.get(`${API_URL}/community/posts`)
-        ]);
-      })
-      .then(([coursesRes, podcastsRes, postsRes]) => {
-        setCourses(coursesRes.data.slice(0, 3));
-        setPodcasts(podcastsRes.data.slice(0, 3));
-        setCommunityPosts(postsRes.data.slice(0, 3));
+        setUser(res.data.user);
+        setCourses(res.data.courses);
+        setPodcasts(res.data.podcasts);
+        setCommunityPosts(res.data.community_posts);
+        setProgress(Object.fromEntries(res.data.progress.map(p => [p.course_id, p])));
         setLoading(false);
       })
       .catch(err => {
         console.error('Error fetching dashboard data:', err);
         if (err.response?.status === 401) {
-          localStorage.removeItem('tkr_token');
+          clearSession();
           navigate('/login');
         }
         setLoading(false);
       });
   }, [navigate]);
 
+  useLiveUpdates(['community_posts'], (event) => {
+    setCommunityPosts(current => applyPostEvent(current, event).slice(0, 3));
+  });
+
   if (loading) {
     return (
       <div className="min-h-screen flex items-center justify-center">
@@ -118,7 +119,7 @@ const DashboardPage = () => {
           <Card>
             <CardContent className="p-6 text-center">
               <BookOpen size={32} className="mx-auto tkr-burgundy mb-2" />
-              <p className="text-2xl font-bold text-gray-900">0</p>
+              <p className="text-2xl font-bold text-gray-900">{Object.keys(progress).length}</p>
               <p className="text-sm text-gray-600">Courses Enrolled</p>
             </CardContent>
           </Card>
@@ -181,9 +182,9 @@ const DashboardPage = () => {
                           {course.tier}
                         </span>
                       </div>
-                      <Progress value={0} className="h-2" />
+                      <Progress value={progress[course.id]?.percent_complete || 0} className="h-2" />
                       <div className="flex items-center justify-between text-sm">
-                        <span className="text-gray-600">0% Complete</span>
+                        <span className="text-gray-600">{Math.round(progress[course.id]?.percent_complete || 0)}% Complete</span>
                         <Link to={`/courses/${course.id}`}>
                           <Button size="sm" variant="outline">Continue</Button>
                         </Link>
@@ -20,29 +20,17 @@ const HomePage = () => {
   });
 
   useEffect(() => {
-    // Fetch hero content
-    axios.get(`${API_URL}/content/homepage_hero`)
+    // One request for everything the page renders on load
+    axios.get(`${API_URL}/bundle/home`)
       .then(res => {
-        if (res.data.data && Object.keys(res.data.data).length > 0) {
-          setHeroContent(res.data.data);
+        if (res.data.hero && Object.keys(res.data.hero).length > 0) {
+          setHeroContent(res.data.hero);
         }
+        setStats(res.data.stats);
+        setPodcasts(res.data.podcasts);
+        setCommunityPosts(res.data.community_posts);
       })
-      .catch(err => console.error('Error fetching hero content:', err));
-
-    // Fetch stats
-    axios.get(`${API_URL}/admin/analytics/content`)
-      .then(res => setStats(res.data))
-      .catch(err => console.error('Error fetching stats:', err));
-
-    // Fetch latest podcasts
-    axios.get(`${API_URL}/podcast/episodes`)
-      .then(res => setPodcasts(res.data.slice(0, 3)))
-      .catch(err => console.error('Error fetching podcasts:', err));
-
-    // Fetch community posts
-    axios.get(`${API_URL}/community/posts`)
-      .then(res => setCommunityPosts(res.data.slice(0, 2)))
-      .catch(err => console.error('Error fetching posts:', err));
+      .catch(err => console.error('Error fetching homepage:', err));
   }, []);
 
   return (
@@ -6,6 +6,7 @@ import { Card, CardContent } from '@/components/ui/card';
 import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
 import axios from 'axios';
+import { saveSession } from '@/lib/auth';
 import { toast } from 'sonner';
 
 const API_URL = process.env.REACT_APP_BACKEND_URL + '/api';
@@ -25,7 +26,7 @@ const SignupPage = () => {
 
     try {
       const response = await axios.post(`${API_URL}/auth/register`, formData);
-      localStorage.setItem('tkr_token', response.data.token);
+      saveSession(response.data);
       toast.success('Account created successfully!');
       navigate('/dashboard');
     } catch (error) {